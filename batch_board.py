@@ -0,0 +1,163 @@
+import numpy as np
+import bitboard
+
+'''
+批量棋盘规则：一次处理N个局面
+局面以(N, 2)的uint64数组表示，第0列为当前玩家棋子，第1列为对方棋子
+也可以传入与Board.current_state()相同布局的(N, 2, 8, 8)数组
+'''
+
+_ZERO = np.uint64(0)
+_ONE = np.uint64(1)
+
+# 8个方向的左移量、右移量和移位后掩码，形状为(8, 1)，与(N,)数组广播后8个方向一次算完
+_LEFT = np.array([[max(d, 0)] for d, _ in bitboard.SHIFTS], dtype=np.uint64)
+_RIGHT = np.array([[max(-d, 0)] for d, _ in bitboard.SHIFTS], dtype=np.uint64)
+_MASK = np.array([[mask] for _, mask in bitboard.SHIFTS], dtype=np.uint64)
+
+
+def _shift(x):
+    '''
+    (N,)或(8, N)数组沿8个方向各移一格，返回(8, N)
+    '''
+    return ((x << _LEFT) >> _RIGHT) & _MASK
+
+
+def popcount(x):
+    '''
+    逐元素统计uint64数组中的棋子数
+    '''
+    x = np.ascontiguousarray(x, dtype='<u8')
+    bits = np.unpackbits(x.view(np.uint8).reshape(x.shape + (8,)), axis=-1)
+    return bits.sum(axis=-1).astype(np.int64)
+
+
+def pack(states):
+    '''
+    (N, 2, 8, 8)的0/1平面转为(N, 2)的uint64局面
+    '''
+    states = np.asarray(states)
+    n = states.shape[0]
+    bits = (states.reshape(n, 2, 64) > 0).astype(np.uint8)
+    packed = np.packbits(bits, axis=-1, bitorder='little')
+    return np.ascontiguousarray(packed).view('<u8').reshape(n, 2)
+
+
+def to_states(positions, dtype=np.float32):
+    '''
+    (N, 2)的uint64局面转为与Board.current_state()相同布局的(N, 2, 8, 8)数组
+    可直接送入PolicyValueNet.policy_value批量推理
+    '''
+    positions = np.ascontiguousarray(positions, dtype='<u8')
+    n = positions.shape[0]
+    raw = positions.view(np.uint8).reshape(n, 2, 8)
+    bits = np.unpackbits(raw, axis=-1, bitorder='little')
+    return bits.reshape(n, 2, 8, 8).astype(dtype)
+
+
+def as_positions(x):
+    '''
+    接受(N, 2)局面或(N, 2, 8, 8)平面，统一返回(N, 2)的uint64局面
+    '''
+    x = np.asarray(x)
+    if x.ndim == 4:
+        return pack(x)
+    return x.astype('<u8', copy=False)
+
+
+def from_boards(boards):
+    '''
+    一组Board对象转为(N, 2)的uint64局面（各自以当前行棋方为第0列）
+    '''
+    return np.array([board.sides() for board in boards], dtype='<u8').reshape(-1, 2)
+
+
+def legal_moves(positions):
+    '''
+    计算每个局面当前玩家的合法落子，返回(N,)的uint64掩码
+    '''
+    positions = as_positions(positions)
+    p = positions[:, 0]
+    o = positions[:, 1]
+    t = _shift(p) & o
+    for _ in range(5):
+        t |= _shift(t) & o
+    return np.bitwise_or.reduce(_shift(t), axis=0) & ~(p | o)
+
+
+def legal_planes(positions):
+    '''
+    合法落子的(N, 8, 8)布尔数组
+    '''
+    moves = legal_moves(positions)
+    raw = np.ascontiguousarray(moves, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(raw, axis=-1, bitorder='little').reshape(-1, 8, 8).astype(bool)
+
+
+def _flips(p, o, move):
+    '''
+    每个局面在move（至多一位）落子后被翻转的棋子：
+    沿每个方向收集与落子相连的对方棋子，其外侧紧接着己方棋子时才翻转
+    '''
+    t = _shift(move) & o
+    for _ in range(5):
+        t |= _shift(t) & o
+    bounded = _shift(t) & p
+    return np.bitwise_or.reduce(np.where(bounded != 0, t, _ZERO), axis=0)
+
+
+def apply_moves(positions, moves):
+    '''
+    在每个局面执行一步棋并交换行棋方
+    moves为(N,)的格子编号 i*8+j，负数表示跳过回合
+    返回新的(N, 2)局面，第0列为新的行棋方
+    '''
+    positions = as_positions(positions)
+    moves = np.asarray(moves, dtype=np.int64)
+    p = positions[:, 0]
+    o = positions[:, 1]
+    move = np.where(moves >= 0, _ONE << np.maximum(moves, 0).astype(np.uint64), _ZERO)
+    flipped = _flips(p, o, move)
+    result = np.empty_like(positions)
+    result[:, 0] = o ^ flipped
+    result[:, 1] = p | flipped | move
+    return result
+
+
+def game_status(positions):
+    '''
+    返回(terminal, score)
+    terminal为(N,)布尔数组，表示双方都无子可下
+    score为(N,)整数数组，当前玩家与对方的棋子差
+    '''
+    positions = as_positions(positions)
+    terminal = (legal_moves(positions) == 0) & (legal_moves(positions[:, ::-1]) == 0)
+    counts = popcount(positions)
+    return terminal, counts[:, 0] - counts[:, 1]
+
+
+def random_playouts(positions, rng=None):
+    '''
+    从每个局面开始双方随机落子直到终局（跳过回合按规则处理）
+    返回(N,)整数数组，终局时以各局面原行棋方为视角的棋子差
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    positions = as_positions(positions)
+    n = positions.shape[0]
+    passes = np.zeros(n, dtype=np.int8)
+    swapped = False
+    while True:
+        moves = legal_moves(positions)
+        passes = np.where(moves != 0, 0, passes + 1)
+        if passes.min() >= 2:
+            break
+        # 给每个局面的合法位置随机打分，取分数最高者即均匀随机选一个合法位置
+        raw = np.ascontiguousarray(moves, dtype='<u8').view(np.uint8).reshape(n, 8)
+        bits = np.unpackbits(raw, axis=-1, bitorder='little')
+        squares = np.argmax(bits * rng.random((n, 64)), axis=1)
+        positions = apply_moves(positions, np.where(moves != 0, squares, -1))
+        swapped = not swapped
+    counts = popcount(positions)
+    score = counts[:, 0] - counts[:, 1]
+    return -score if swapped else score
@@ -0,0 +1,201 @@
+import numpy as np
+
+'''
+黑白棋位棋盘（bitboard）基础运算
+一个局面用两个64位整数表示，第i行第j列对应第 i*8+j 位
+'''
+
+FULL = 0xFFFFFFFFFFFFFFFF           # 全部64个格子
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE     # 去掉第0列，防止向右移位时跨行
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F     # 去掉第7列，防止向左移位时跨行
+
+# 8个方向的(位移量, 移位后掩码)，正数为左移，负数为右移
+SHIFTS = [
+    (1, NOT_A_FILE),     # 右
+    (-1, NOT_H_FILE),    # 左
+    (8, FULL),           # 下
+    (-8, FULL),          # 上
+    (9, NOT_A_FILE),     # 右下
+    (7, NOT_H_FILE),     # 左下
+    (-7, NOT_A_FILE),    # 右上
+    (-9, NOT_H_FILE),    # 左上
+]
+
+
+def square(i, j):
+    """坐标(i,j)对应的位"""
+    return 1 << (i * 8 + j)
+
+
+def popcount(x):
+    """统计位棋盘中的棋子数"""
+    return bin(x).count('1')
+
+
+def squares(x):
+    """按从低位到高位（即按行扫描）的顺序枚举位棋盘中的格子编号"""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+def to_coords(x):
+    """位棋盘转为坐标列表[(i,j), ...]"""
+    return [divmod(sq, 8) for sq in squares(x)]
+
+
+def to_plane(x):
+    """位棋盘转为8x8的0/1数组"""
+    raw = np.array([x], dtype='<u8').view(np.uint8)
+    return np.unpackbits(raw, bitorder='little').reshape(8, 8)
+
+
+def to_planes(p, o, out=None):
+    '''
+    (当前玩家, 对方)两个位棋盘转为(2, 8, 8)的float32输入平面
+    传入out时直接写入该缓冲区
+    '''
+    raw = np.array([p, o], dtype='<u8').view(np.uint8)
+    bits = np.unpackbits(raw, bitorder='little').reshape(2, 8, 8)
+    if out is None:
+        return bits.astype(np.float32)
+    out[...] = bits
+    return out
+
+
+def legal_moves(p, o):
+    '''
+    计算合法落子位置
+    p为当前玩家棋子，o为对方棋子，返回合法位置的位棋盘
+    '''
+    empty = ~(p | o) & FULL
+    moves = 0
+    for d, mask in SHIFTS:
+        om = o & mask
+        if d > 0:
+            t = om & (p << d)
+            t |= om & (t << d)
+            t |= om & (t << d)
+            t |= om & (t << d)
+            t |= om & (t << d)
+            t |= om & (t << d)
+            moves |= (t << d) & mask
+        else:
+            d = -d
+            t = om & (p >> d)
+            t |= om & (t >> d)
+            t |= om & (t >> d)
+            t |= om & (t >> d)
+            t |= om & (t >> d)
+            t |= om & (t >> d)
+            moves |= (t >> d) & mask
+    return moves & empty
+
+
+def _build_outflank():
+    '''
+    OUTFLANK[pos][o8]: 一条线上在pos落子时，与pos相邻的连续对方棋子之外的那一格
+    （即需要己方棋子夹住的位置），两个方向合并为一个8位掩码
+    '''
+    table = []
+    for pos in range(8):
+        row = []
+        for o in range(256):
+            out = 0
+            if not (o >> pos) & 1:
+                k = pos + 1
+                while k < 8 and (o >> k) & 1:
+                    k += 1
+                if k < 8 and k > pos + 1:
+                    out |= 1 << k
+                k = pos - 1
+                while k >= 0 and (o >> k) & 1:
+                    k -= 1
+                if k >= 0 and k < pos - 1:
+                    out |= 1 << k
+            row.append(out)
+        table.append(row)
+    return table
+
+
+def _build_flipped():
+    '''
+    FLIPPED[pos][outflank]: 在pos落子、己方棋子位于outflank时，这条线上被翻转的格子
+    '''
+    table = []
+    for pos in range(8):
+        row = []
+        for out in range(256):
+            f = 0
+            for k in range(8):
+                if (out >> k) & 1:
+                    if k > pos:
+                        f |= ((1 << k) - 1) & ~((1 << (pos + 1)) - 1)
+                    elif k < pos:
+                        f |= ((1 << pos) - 1) & ~((1 << (k + 1)) - 1)
+            row.append(f)
+        table.append(row)
+    return table
+
+
+def _build_diagonals():
+    '''
+    每个格子所在的主对角线与副对角线掩码
+    '''
+    diag = []
+    anti = []
+    for sq in range(64):
+        i, j = divmod(sq, 8)
+        d = 0
+        a = 0
+        for r in range(8):
+            if 0 <= r - i + j < 8:
+                d |= square(r, r - i + j)
+            if 0 <= i + j - r < 8:
+                a |= square(r, i + j - r)
+        diag.append(d)
+        anti.append(a)
+    return diag, anti
+
+
+OUTFLANK = _build_outflank()
+FLIPPED = _build_flipped()
+DIAG, ANTI = _build_diagonals()
+
+A_FILE = 0x0101010101010101                # 第0列
+COL_MAGIC = 0x0102040810204080             # 把第0列的8个格子收集到最高字节
+SPREAD = 0x0101010101010101                # 把8位的列掩码复制到每一行
+COL_SPREAD = [sum(1 << (8 * k) for k in range(8) if (b >> k) & 1) for b in range(256)]  # 8位掩码展开到第0列
+
+
+def flips(p, o, sq):
+    '''
+    计算在sq落子后被翻转的对方棋子
+    分别取出经过sq的行、列、两条对角线的8位线型，查表得到翻转的格子
+    '''
+    i = sq >> 3
+    j = sq & 7
+    outflank = OUTFLANK[j]
+    flipped_j = FLIPPED[j]
+
+    # 行：线上位置为列号j
+    s = i << 3
+    flipped = flipped_j[outflank[(o >> s) & 0xFF] & (p >> s)] << s
+
+    # 列：线上位置为行号i
+    pc = (((p >> j) & A_FILE) * COL_MAGIC >> 56) & 0xFF
+    oc = (((o >> j) & A_FILE) * COL_MAGIC >> 56) & 0xFF
+    flipped |= COL_SPREAD[FLIPPED[i][OUTFLANK[i][oc] & pc]] << j
+
+    # 对角线：线上位置为列号j
+    m = DIAG[sq]
+    pd = ((p & m) * SPREAD >> 56) & 0xFF
+    od = ((o & m) * SPREAD >> 56) & 0xFF
+    flipped |= (flipped_j[outflank[od] & pd] * SPREAD) & m
+
+    m = ANTI[sq]
+    pd = ((p & m) * SPREAD >> 56) & 0xFF
+    od = ((o & m) * SPREAD >> 56) & 0xFF
+    flipped |= (flipped_j[outflank[od] & pd] * SPREAD) & m
+    return flipped
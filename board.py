@@ -1,367 +1,257 @@
-import numpy as np
+import bitboard
+import zobrist
 
 class Board(object):
+    # 只保存压缩后的局面与少量缓存，神经网络输入平面按需生成
+    __slots__ = ('black', 'white', '_color', 'key', 'current_player',
+                 '_moves_x', '_moves_o', '_locations_x', '_locations_o', '_over')
+
     def __init__(self):
         '''
         棋盘初始化
+        棋盘以位棋盘存储：black/white分别为黑白棋子的64位掩码
+        key为局面（含行棋方）的Zobrist键值，随落子增量更新
         '''
-        self.board = [['.' for _ in range(8)] for _ in range(8)]
-        self.board[3][4] = 'X' # X为黑棋
-        self.board[4][3] = 'X' # X为黑棋
-        self.board[3][3] = 'O' # O为白棋
-        self.board[4][4] = 'O' # O为白棋
-        self.color = 'X'
-        self.availables = []  # 添加availables属性
+        self.black = bitboard.square(3, 4) | bitboard.square(4, 3) # X为黑棋
+        self.white = bitboard.square(3, 3) | bitboard.square(4, 4) # O为白棋
+        self._color = 'X'
+        self.key = zobrist.hash_position(self.black, self.white, self._color)
         self.current_player = 'X'  # 添加current_player属性，与color保持一致
-        
+        self._clear_cache()
+
+    @classmethod
+    def from_masks(cls, black, white, color='X'):
+        '''
+        由黑白棋子掩码和行棋方直接构造棋盘
+        '''
+        board = cls.__new__(cls)
+        board.black = black
+        board.white = white
+        board._color = color
+        board.key = zobrist.hash_position(black, white, color)
+        board.current_player = color
+        board._clear_cache()
+        return board
+
+    def _clear_cache(self):
+        '''
+        清空当前局面的缓存，局面改变（落子或撤销）时调用
+        _moves_x/_moves_o: 黑/白方合法位置掩码
+        _locations_x/_locations_o: 黑/白方合法位置坐标列表
+        _over: 是否终局
+        '''
+        self._moves_x = None
+        self._moves_o = None
+        self._locations_x = None
+        self._locations_o = None
+        self._over = None
+
+    @property
+    def color(self):
+        '''
+        行棋方，'X'为黑棋，'O'为白棋
+        '''
+        return self._color
+
+    @color.setter
+    def color(self, color):
+        if color != self._color:
+            self.key ^= zobrist.SIDE
+            self._color = color
+
+    @property
+    def board(self):
+        '''
+        8x8的'X'/'O'/'.'二维列表视图（只读）
+        '''
+        rows = [['.' for _ in range(8)] for _ in range(8)]
+        for sq in bitboard.squares(self.black):
+            rows[sq >> 3][sq & 7] = 'X'
+        for sq in bitboard.squares(self.white):
+            rows[sq >> 3][sq & 7] = 'O'
+        return rows
+
+    @property
+    def availables(self):
+        '''
+        当前玩家的合法位置
+        '''
+        return self.locations()
+
+    @property
+    def black_count(self):
+        return bitboard.popcount(self.black)
+
+    @property
+    def white_count(self):
+        return bitboard.popcount(self.white)
+
+    def sides(self):
+        '''
+        返回(当前玩家棋子, 对方棋子)
+        '''
+        if self.color == 'X':
+            return self.black, self.white
+        return self.white, self.black
+
     def display(self):
         '''
         打印棋盘
         '''
-        for i in range(8):
-            for j in range(8):
-                print(self.board[i][j], end=' ')
+        for row in self.board:
+            for cell in row:
+                print(cell, end=' ')
             print('')
-    
+
     def pieces_index(self):
         '''
         找寻黑白棋子位置并计数
+        棋子数与输入平面现在都由位棋盘按需计算，保留此方法以兼容原有调用
         '''
-        self.black_count = 0
-        self.white_count = 0
-        self.board1 = np.zeros((8,8))       #为当前玩家创建空的8x8数组
-        self.board2 = np.zeros((8,8))       #为对方玩家创建空的8x8数组
-        for i in range(8):
-            for j in range(8):
-                if self.color == 'X':
-                    if self.board[i][j] == 'X':
-                        self.board1[i][j] = 1
-                        self.black_count = self.black_count + 1
-                    elif self.board[i][j] == 'O':
-                        self.board2[i][j] = 1
-                        self.white_count = self.white_count + 1
-                else:
-                    if self.board[i][j] == 'O':
-                        self.board1[i][j] = 1
-                        self.white_count = self.white_count + 1
-                    elif self.board[i][j] == 'X':
-                        self.board2[i][j] = 1
-                        self.black_count = self.black_count + 1
+        pass
 
-        
     def show_pieces_index(self):
         '''
         展示各棋数目
         '''
         print('黑棋总数：', self.black_count)
         print('白棋总数：', self.white_count)
-        
+
     def pass_action(self):
         '''
         当没有合法走法时，返回一个表示"过"的特殊动作
         '''
         print(f"玩家 {self.current_player} 没有合法走法，跳过回合。")
         return None
-        
+
+    def legal_moves(self, color=None):
+        '''
+        指定玩家（默认为当前玩家）的合法位置掩码，同一局面只计算一次
+        '''
+        if color is None:
+            color = self._color
+        if color == 'X':
+            if self._moves_x is None:
+                self._moves_x = bitboard.legal_moves(self.black, self.white)
+            return self._moves_x
+        if self._moves_o is None:
+            self._moves_o = bitboard.legal_moves(self.white, self.black)
+        return self._moves_o
+
     def locations(self):
         '''
-        获取下棋合法位置并标记应反转棋子
-        合法位置为详细信息
-        合法位置1为简单坐标信息
-        '''
-        self.legal_loc = []
-        self.legal_loc1 = []
-        neighbor = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
-        if self.color == 'X':      #黑棋玩家
-            for i in range(8):
-                for j in range(8):
-                    for dx, dy in neighbor:
-                        x = i + dx
-                        y = j + dy
-                        if x >= 0 and x <= 7 and y >=0 and y <= 7 and self.board[i][j] == '.' and self.board[x][y] =='O':
-                            if dx > 0 and dy > 0:
-                                for k in range(1, min(8-x, 8-y)):
-                                    if self.board[x+k][y+k] == 'X':
-                                        self.legal_loc.append(((i,j),'bottomright',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x+k][y+k] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx > 0 and dy == 0:
-                                for k in range(1, 8-x):
-                                    if self.board[x+k][y] == 'X':        
-                                        self.legal_loc.append(((i,j),'bottom',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x+k][y] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx > 0 and dy < 0:
-                                for k in range(1, min(8-x, y+1)):
-                                    if self.board[x+k][y-k] == 'X':
-                                        self.legal_loc.append(((i,j),'bottomleft',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x+k][y-k] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx < 0 and dy > 0:
-                                for k in range(1, min(x+1, 8-y)):
-                                    if self.board[x-k][y+k] == 'X':
-                                        self.legal_loc.append(((i,j),'topright',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x-k][y+k] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx < 0 and dy == 0:
-                                for k in range(1, x+1):
-                                    if self.board[x-k][y] == 'X':
-                                        self.legal_loc.append(((i,j),'top',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x-k][y] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx < 0 and dy < 0:
-                                for k in range(1, min(x+1, y+1)):
-                                    if self.board[x-k][y-k] == 'X':
-                                        self.legal_loc.append(((i,j),'topleft',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x-k][y-k] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx == 0 and dy > 0:
-                                for k in range(1, 8-y):
-                                    if self.board[x][y+k] == 'X':
-                                        self.legal_loc.append(((i,j),'right',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x][y+k] =='O':
-                                        pass
-                                    else:
-                                        break
-                            elif dx == 0 and dy < 0:
-                                for k in range(1, y+1):
-                                    if self.board[x][y-k] == 'X':
-                                        self.legal_loc.append(((i,j),'left',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x][y-k] =='O':
-                                        pass
-                                    else:
-                                        break
-                        else:
-                            continue
-            self.availables = list({}.fromkeys(self.legal_loc1).keys())  # 更新availables
-            return self.availables
-        else:
-            for i in range(8):
-                for j in range(8):
-                    for dx, dy in neighbor:
-                        x = i + dx
-                        y = j + dy
-                        if x >= 0 and x <= 7 and y >=0 and y <= 7 and self.board[i][j] == '.' and self.board[x][y] =='X':
-                            if dx > 0 and dy > 0:
-                                for k in range(1, min(8-x, 8-y)):
-                                    if self.board[x+k][y+k] == 'O':
-                                        self.legal_loc.append(((i,j),'bottomright',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x+k][y+k] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx > 0 and dy == 0:
-                                for k in range(1, 8-x):
-                                    if self.board[x+k][y] == 'O':        
-                                        self.legal_loc.append(((i,j),'bottom',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x+k][y] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx > 0 and dy < 0:
-                                for k in range(1, min(8-x, y+1)):
-                                    if self.board[x+k][y-k] == 'O':
-                                        self.legal_loc.append(((i,j),'bottomleft',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x+k][y-k] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx < 0 and dy > 0:
-                                for k in range(1, min(x+1, 8-y)):
-                                    if self.board[x-k][y+k] == 'O':
-                                        self.legal_loc.append(((i,j),'topright',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x-k][y+k] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx < 0 and dy == 0:
-                                for k in range(1, x+1):
-                                    if self.board[x-k][y] == 'O':
-                                        self.legal_loc.append(((i,j),'top',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x-k][y] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx < 0 and dy < 0:
-                                for k in range(1, min(x+1, y+1)):
-                                    if self.board[x-k][y-k] == 'O':
-                                        self.legal_loc.append(((i,j),'topleft',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x-k][y-k] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx == 0 and dy > 0:
-                                for k in range(1, 8-y):
-                                    if self.board[x][y+k] == 'O':
-                                        self.legal_loc.append(((i,j),'right',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x][y+k] =='X':
-                                        pass
-                                    else:
-                                        break
-                            elif dx == 0 and dy < 0:
-                                for k in range(1, y+1):
-                                    if self.board[x][y-k] == 'O':
-                                        self.legal_loc.append(((i,j),'left',k))
-                                        self.legal_loc1.append((i,j))
-                                        break
-                                    elif self.board[x][y-k] =='X':
-                                        pass
-                                    else:
-                                        break
-                        else:
-                            continue
-            self.availables = list({}.fromkeys(self.legal_loc1).keys())  # 更新availables
-            return self.availables
-        
-    
+        获取当前玩家的下棋合法位置
+        按行扫描顺序返回坐标列表，同一局面重复调用直接返回缓存
+        '''
+        if self._color == 'X':
+            if self._locations_x is None:
+                self._locations_x = bitboard.to_coords(self.legal_moves('X'))
+            return self._locations_x
+        if self._locations_o is None:
+            self._locations_o = bitboard.to_coords(self.legal_moves('O'))
+        return self._locations_o
+
+
     def reversi_pieces(self, action):
         '''
         反转棋子
         '''
-        x = action[0]
-        y = action[1]
-        if self.color == 'X':
-            self.board[x][y] = 'X'
-            for i in self.legal_loc:
-                if (x, y) == i[0]:
-                    if i[1] == 'right':
-                        for j in range(i[2]+1):
-                            self.board[x][y+j] = 'X'
-                    elif i[1] == 'left':
-                        for j in range(i[2]+1):
-                            self.board[x][y-j] = 'X'
-                    elif i[1] == 'top':
-                        for j in range(i[2]+1):
-                            self.board[x-j][y] = 'X'
-                    elif i[1] == 'bottom':
-                        for j in range(i[2]+1):
-                            self.board[x+j][y] = 'X'
-                    elif i[1] == 'topleft':
-                        for j in range(i[2]+1):
-                            self.board[x-j][y-j] = 'X'
-                    elif i[1] == 'bottomleft':
-                        for j in range(i[2]+1):
-                            self.board[x+j][y-j] = 'X'
-                    elif i[1] == 'topright':
-                        for j in range(i[2]+1):
-                            self.board[x-j][y+j] = 'X'
-                    elif i[1] == 'bottomright':
-                        for j in range(i[2]+1):
-                            self.board[x+j][y+j] = 'X'
-        if self.color == 'O':
-            self.board[x][y] = 'O'
-            for i in self.legal_loc:
-                if (x, y) == i[0]:
-                    if i[1] == 'right':
-                        for j in range(i[2]+1):
-                            self.board[x][y+j] = 'O'
-                    elif i[1] == 'left':
-                        for j in range(i[2]+1):
-                            self.board[x][y-j] = 'O'
-                    elif i[1] == 'top':
-                        for j in range(i[2]+1):
-                            self.board[x-j][y] = 'O'
-                    elif i[1] == 'bottom':
-                        for j in range(i[2]+1):
-                            self.board[x+j][y] = 'O'
-                    elif i[1] == 'topleft':
-                        for j in range(i[2]+1):
-                            self.board[x-j][y-j] = 'O'
-                    elif i[1] == 'bottomleft':
-                        for j in range(i[2]+1):
-                            self.board[x+j][y-j] = 'O'
-                    elif i[1] == 'topright':
-                        for j in range(i[2]+1):
-                            self.board[x-j][y+j] = 'O'
-                    elif i[1] == 'bottomright':
-                        for j in range(i[2]+1):
-                            self.board[x+j][y+j] = 'O' 
-                                   
+        self._place(action[0] * 8 + action[1])
+
+    def _place(self, sq):
+        '''
+        当前玩家在sq落子并翻转棋子（不交换行棋方），同步更新键值
+        返回被翻转的棋子
+        '''
+        p, o = self.sides()
+        flipped = bitboard.flips(p, o, sq)
+        delta = zobrist.flip_hash(flipped)
+        self._clear_cache()
+        if self._color == 'X':
+            self.black = p | flipped | (1 << sq)
+            self.white = o ^ flipped
+            self.key ^= delta ^ zobrist.BLACK[sq]
+        else:
+            self.white = p | flipped | (1 << sq)
+            self.black = o ^ flipped
+            self.key ^= delta ^ zobrist.WHITE[sq]
+        return flipped
+
+    def play(self, action):
+        '''
+        当前玩家落子并交换行棋方，返回撤销记录供undo使用
+        action为None时表示跳过回合
+        '''
+        color = self._color
+        key = self.key
+        move = 0
+        flipped = 0
+        if action is not None:
+            sq = action[0] * 8 + action[1]
+            move = 1 << sq
+            flipped = self._place(sq)
+        self.color = 'O' if color == 'X' else 'X'
+        return (move, flipped, color, key)
+
+    def undo(self, record):
+        '''
+        撤销play产生的一步棋，恢复翻转的棋子和行棋方
+        '''
+        move, flipped, color, key = record
+        if color == 'X':
+            self.black ^= flipped | move
+            self.white ^= flipped
+        else:
+            self.white ^= flipped | move
+            self.black ^= flipped
+        self._color = color
+        self.key = key
+        self._clear_cache()
+
+    def clone(self):
+        '''
+        只复制局面本身的轻量拷贝，代替copy.deepcopy
+        '''
+        board = Board.__new__(Board)
+        board.black = self.black
+        board.white = self.white
+        board._color = self._color
+        board.key = self.key
+        board.current_player = self.current_player
+        board._moves_x = self._moves_x
+        board._moves_o = self._moves_o
+        board._locations_x = self._locations_x
+        board._locations_o = self._locations_o
+        board._over = self._over
+        return board
+
     def is_game_over(self):
         '''
         判断游戏是否结束
         当双方都没有合法落子位置时游戏结束
         '''
-        # 保存当前颜色
-        current_color = self.color
-        
-        # 检查黑棋是否有合法落子位置
-        self.color = 'X'
-        black_moves = self.locations()
-        
-        # 检查白棋是否有合法落子位置
-        self.color = 'O'
-        white_moves = self.locations()
-        
-        # 恢复原来的颜色
-        self.color = current_color
-        
-        # 如果双方都没有合法落子位置，游戏结束
-        return len(black_moves) == 0 and len(white_moves) == 0
+        if self._over is None:
+            self._over = self.legal_moves('X') == 0 and self.legal_moves('O') == 0
+        return self._over
 
     def win(self):
         '''
         判断胜负
         返回1表示黑棋胜，-1表示白棋胜，0表示平局
         '''
-        self.pieces_index()
-        if self.black_count > self.white_count:
+        black_count = bitboard.popcount(self.black)
+        white_count = bitboard.popcount(self.white)
+        if black_count > white_count:
             return 1
-        elif self.black_count < self.white_count:
+        elif black_count < white_count:
             return -1
         else:
             return 0
-        
-    def current_state(self):
+
+    def current_state(self, out=None):
         '''
         棋盘当前状态（包含当前选手棋盘和对方选手两个界面）
+        返回(2, 8, 8)的float32数组；传入out时写入该缓冲区以便重复使用
         '''
-        current_state = np.dstack((self.board1,self.board2))
-        current_state = current_state.transpose((2,0,1))
-        return current_state
-    
-
-        
-        
\ No newline at end of file
+        p, o = self.sides()
+        return bitboard.to_planes(p, o, out)
@@ -1,268 +1,450 @@
+import time
+import bitboard
+import zobrist
+import symmetry
+import probcut as probcut_module
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from pattern_eval import PatternEvaluator
+
 COLOR_BLACK = -1
 COLOR_WHITE = 1
 COLOR_NONE = 0
 
-# 定义8个方向向量：上、下、左、右、左上、右上、左下、右下
-DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+# 走法排序的静态分值：角优先，X位（角的斜向相邻格）靠后
+CORNER_SQUARES = {(0, 0), (0, 7), (7, 0), (7, 7)}
+X_SQUARES = {(1, 1), (1, 6), (6, 1), (6, 6)}
+ORDER_TT = 1 << 30        # 转置表中的最佳走法
+ORDER_CORNER = 1 << 28    # 角
+ORDER_KILLER = 1 << 26    # 杀手走法
+X_SQUARE_PENALTY = 1      # X位的静态惩罚，只用于打破同分
+
+INFINITY = 100000         # 搜索窗口的无穷大（大于任何估值）
+ASPIRATION_WINDOW = 600   # 渴望窗口的半宽
+
+
+def to_bitboard(chessboard):
+    """把-1/0/1的二维列表棋盘转换为AI使用的(黑棋掩码, 白棋掩码)"""
+    black = 0
+    white = 0
+    for i, row in enumerate(chessboard):
+        for j, v in enumerate(row):
+            if v == COLOR_BLACK:
+                black |= bitboard.square(i, j)
+            elif v == COLOR_WHITE:
+                white |= bitboard.square(i, j)
+    return black, white
+
+
+class SearchTimeout(Exception):
+    """搜索超过时间限制，由迭代加深驱动捕获并丢弃未完成的一轮"""
+    pass
 
 class AI(object):
-    def __init__(self, chessboard_size, color, time_out):
+    def __init__(self, chessboard_size, color, time_out, tt_size=16, weights=None, symmetric_tt=False,
+                 probcut=False, probcut_params=None, probcut_threshold=None):
         self.chessboard_size = chessboard_size
         self.color = color
-        self.time_out = time_out
+        self.time_out = time_out    # 每步思考时间（秒）
         self.candidate_list = []
-        self.transposition_table = {}  # 添加转置表提高搜索效率
+        self.deadline = None        # 本步搜索的截止时间，None表示不限时
+        self.nodes = 0              # 已搜索的节点数
+        self.pv = []                # 上一轮迭代的主要变例
+        self._follow_pv = False     # 当前是否仍沿主要变例搜索
+        self._root_exclude = ()     # 多主变例分析时根节点排除的走法（已列出的更优走法）
+        self.completed_depth = 0    # 最近一次完整完成的搜索深度
+        self.root_move = None       # 最近一次搜索的根节点最佳走法
+        self.best_score = None      # 最近一轮完整迭代的根节点估值
+        self.killers = [[] for _ in range(64)]   # 每层最近引起剪枝的两个走法
+        self.history = [0] * 64                  # 历史启发表：走法引起剪枝的累计得分
+        self.cutoffs = 0            # 剪枝次数
+        self.first_move_cutoffs = 0 # 第一个走法就引起剪枝的次数
+        # 定长转置表，在一局棋的各步之间保留
+        # 保存的估值以该局面的行棋方为视角，与AI执哪一方无关
+        self.transposition_table = TranspositionTable(tt_size)
+        # 为True时以对称规范代表的键值查询转置表，旋转、镜像后的局面共用条目
+        self.symmetric_tt = symmetric_tt
+        # 模式查表评估函数，weights为权重文件路径，None时使用默认权重
+        self.evaluator = PatternEvaluator(weights)
+        # Multi-ProbCut：probcut为True时启用，probcut_params为参数文件路径，None时使用内置参数
+        self.probcut = probcut
+        self.probcut_params = probcut_module.load_params(probcut_params) if probcut_params else probcut_module.DEFAULT_PARAMS
+        self.probcut_threshold = probcut_threshold or probcut_module.DEFAULT_THRESHOLD
+        self.probcut_cuts = 0       # ProbCut截断次数
+
+    def new_search(self):
+        """开始新一步的搜索：转置表进入新一代，清空杀手走法，历史得分减半，统计清零"""
+        self.transposition_table.new_search()
+        self.killers = [[] for _ in range(64)]
+        self.history = [h >> 1 for h in self.history]
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.probcut_cuts = 0
 
-    def go(self, chessboard):
-        """使用迭代加深搜索寻找最佳下一步"""
+    def search_stats(self):
+        """本步搜索的统计：节点数、剪枝次数、第一个走法即剪枝的比例"""
+        return {
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'probcut_cuts': self.probcut_cuts,
+        }
+
+    def go(self, chessboard, max_depth=60):
+        """
+        限时迭代加深搜索，chessboard为(黑棋掩码, 白棋掩码)
+        依次搜索1, 2, 3, ...层，直到time_out秒用完，返回最后一轮完整搜索的最佳走法
+        """
+        start = time.time()
+        self.deadline = start + self.time_out
+        self.pv = []
+        self.completed_depth = 0
+        
         # 先找出所有合法走法
         self.candidate_list = self.find_choice(chessboard, self.color)
+        if not self.candidate_list:
+            return None
+        best_move = self.candidate_list[0]
+        if len(self.candidate_list) == 1:
+            return best_move
         
-        # 设置Alpha-Beta剪枝初始值
-        alpha = -99999
-        beta = 99999
+        # 开始新一轮搜索，转置表保留上一步的结果
+        self.new_search()
+        key = self._get_board_hash(chessboard, self.color)
         
-        # 清空转置表，避免不同深度间干扰
-        self.transposition_table = {}
+        # 搜索深度不超过剩余空格数
+        black, white = chessboard
+        max_depth = min(max_depth, 64 - bitboard.popcount(black | white))
         
-        # 迭代加深搜索，保持与原代码相同的深度
-        for depth in [2, 3, 4, 6]:
-            move = self.search(self.color, chessboard, 1, alpha, beta, depth)
-            if move is not None:
+        try:
+            score = None
+            for depth in range(1, max_depth + 1):
+                # 渴望窗口：以上一轮的估值为中心，落在窗口外时放宽该侧重新搜索
+                if score is None:
+                    alpha, beta = -INFINITY, INFINITY
+                else:
+                    alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+                while True:
+                    self._follow_pv = True
+                    score = self._pvs(self.color, chessboard, 1, alpha, beta, depth + 1, key)
+                    if score <= alpha and alpha > -INFINITY:
+                        alpha = -INFINITY
+                    elif score >= beta and beta < INFINITY:
+                        beta = INFINITY
+                    else:
+                        break
+                move = self.root_move
+                best_move = move
+                self.best_score = score
                 self.candidate_list.append(move)
+                self.completed_depth = depth
+                self.pv = self._extract_pv(chessboard, self.color, depth)
+                # 已用去一半以上的时间时，下一轮几乎不可能完成
+                if time.time() - start > self.time_out / 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best_move
+
+    def analyse(self, chessboard, k=3, depth=None, time_limit=None):
+        """
+        多主变例分析：返回估值最高的至多k个走法[(走法, 估值, 主要变例, 节点数), ...]，按估值从高到低排列
+        估值以self.color为视角；节点数为该名次在各轮迭代中搜索的节点总数
+        depth与time_limit至少给定一个：按深度迭代加深到depth层，或在time_limit秒内尽量加深
+        每一轮依次搜索第1、2、...、k名（每次排除已列出的走法），各名次共用转置表
+        """
+        start = time.time()
+        if depth is None and time_limit is None:
+            time_limit = self.time_out
+        self.deadline = start + time_limit if time_limit else None
+        self.new_search()
+        key = self._get_board_hash(chessboard, self.color)
+        moves = self.find_choice(chessboard, self.color)
+        k = min(k, len(moves))
+        black, white = chessboard
+        max_depth = min(depth or 60, 64 - bitboard.popcount(black | white))
+        
+        lines = []
+        rank_nodes = [0] * k
+        try:
+            for d in range(1, max_depth + 1):
+                found = []
+                for rank in range(k):
+                    self._root_exclude = [move for move, _, _ in found]
+                    self._follow_pv = False
+                    before = self.nodes
+                    score = self._pvs(self.color, chessboard, 1, -INFINITY, INFINITY, d + 1, key)
+                    rank_nodes[rank] += self.nodes - before
+                    if score is None or score <= -99999:
+                        break   # 其余走法都会让对方无子可下（搜索中跳过这类走法）
+                    move = self.root_move
+                    child, _ = self._make_move(chessboard, key, self.color, move)
+                    found.append((move, score, [move] + self._extract_pv(child, -self.color, d - 1)))
+                found.sort(key=lambda line: line[1], reverse=True)
+                lines = [(move, score, pv, rank_nodes[rank]) for rank, (move, score, pv) in enumerate(found)]
+                self.completed_depth = d
+                # 已用去一半以上的时间时，下一轮几乎不可能完成
+                if time_limit and time.time() - start > time_limit / 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+            self._root_exclude = ()
+        return lines
 
-    def search(self, color, board, deep, alpha, beta, t):
-        """Alpha-Beta搜索"""
-        # 达到搜索深度限制时返回评估值
+    def _extract_pv(self, board, color, depth):
+        """沿转置表中保存的最佳走法取出主要变例"""
+        pv = []
+        key = self._get_board_hash(board, color)
+        for _ in range(depth):
+            key, _, entry = self._probe(board, color, key)
+            if entry is None or entry[3] < 0:
+                break
+            move = divmod(entry[3], 8)
+            if move not in self.find_choice(board, color):
+                break
+            pv.append(move)
+            board, key = self._make_move(board, key, color, move)
+            color = -color
+        return pv
+
+    def search(self, color, board, deep, alpha, beta, t, key=None):
+        """
+        Alpha-Beta搜索接口（兼容原有调用），内部使用负极大值形式的PVS
+        deep为1时返回最佳走法，否则返回以self.color为视角的估值
+        """
+        if deep == 1:
+            if self._pvs(color, board, 1, alpha, beta, t, key) is None:
+                return None
+            return self.root_move
+        if color == self.color:
+            return self._pvs(color, board, deep, alpha, beta, t, key)
+        value = self._pvs(color, board, deep, -beta, -alpha, t, key)
+        return None if value is None else -value
+
+    def _pvs(self, color, board, deep, alpha, beta, t, key=None):
+        """
+        主要变例搜索（PVS / NegaScout），负极大值形式
+        返回以行棋方color为视角的估值；行棋方无子可下时返回None
+        第一个走法用完整窗口搜索，其余走法先用零窗口验证，
+        只有落在(alpha, beta)之间时才用完整窗口重新搜索
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 255 == 0 and time.time() > self.deadline:
+            raise SearchTimeout()
+        
+        # 达到搜索深度限制时返回行棋方视角的评估值
         if deep == t:
-            choice = self.find_choice(board, self.color)
-            un_choice = self.find_choice(board, -self.color)
-            return self.assess(board) + (len(choice) - len(un_choice)) * 220
+            black, white = board
+            if color == COLOR_BLACK:
+                return self.evaluator.evaluate(black, white)
+            return self.evaluator.evaluate(white, black)
         
-        # 检查转置表中是否已有此局面的结果
-        board_hash = self._get_board_hash(board)
-        if board_hash in self.transposition_table:
-            stored_depth, stored_value, stored_move = self.transposition_table[board_hash]
-            if stored_depth >= t - deep:  # 如果已存储的结果搜索深度足够
-                if deep == 1:
-                    return stored_move
-                return stored_value
+        # 检查转置表中是否已有此局面的结果（根节点需要返回走法，不直接截断）
+        key, sym, entry = self._probe(board, color, key)
+        tt_move = -1
+        if entry is not None:
+            stored_depth, stored_value, stored_flag, tt_move = entry
+            if deep > 1 and stored_depth >= t - deep:  # 如果已存储的结果搜索深度足够
+                if stored_flag == EXACT:
+                    return stored_value
+                if stored_flag == LOWER and stored_value >= beta:
+                    return stored_value
+                if stored_flag == UPPER and stored_value <= alpha:
+                    return stored_value
+        
+        # Multi-ProbCut：浅层搜索足以预测深层搜索会超出窗口时提前截断
+        if self.probcut and deep > 1:
+            checks = self.probcut_params.get(t - deep)
+            if checks:
+                value = self._probcut(color, board, deep, alpha, beta, checks, key)
+                if value is not None:
+                    return value
         
         # 获取所有合法走法
         choice = self.find_choice(board, color)
+        if deep == 1 and self._root_exclude:
+            choice = [m for m in choice if m not in self._root_exclude]
         if not choice:
             return None
-            
-        # MAX层处理（奇数层）
-        if deep % 2 == 1:
-            a = -99999  # 最佳值
-            b = 0       # 最佳移动索引
-            
-            for i in range(len(choice)):
-                # 模拟此移动
-                newboard = self.find_change(board, color, choice[i])
-                # 递归搜索下一层
-                n = self.search(-color, newboard, deep+1, alpha, beta, t)
-                
-                if n is not None:
-                    if n > a:
-                        a = n
-                        b = i
-                    # Alpha剪枝
-                    if a >= beta:
-                        # 存储到转置表
-                        self.transposition_table[board_hash] = (t-deep, a, choice[i] if deep == 1 else None)
-                        if deep == 1:
-                            return choice[i]
-                        return a
-                    alpha = max(alpha, a)
-            
-            # 修复：确保在有合法走法时才返回最佳走法
-            if len(choice) > 0:
-                # 记录结果到转置表
-                self.transposition_table[board_hash] = (t-deep, a, choice[b] if deep == 1 else None)
-                if deep == 1:
-                    return choice[b]
-                return a
+        alpha_orig = alpha
+        choice = self._order_moves(choice, deep, tt_move)
+        
+        # 沿上一轮的主要变例搜索时，先尝试主要变例上的走法
+        if self._follow_pv:
+            self._follow_pv = False
+            if deep <= len(self.pv) and self.pv[deep-1] in choice:
+                pv_move = self.pv[deep-1]
+                choice = [pv_move] + [m for m in choice if m != pv_move]
+                self._follow_pv = True
+        
+        best = -99999   # 最佳值
+        b = 0           # 最佳移动索引
+        found = False   # 是否已有子节点返回估值
+        for i in range(len(choice)):
+            # 模拟此移动
+            newboard, newkey = self._make_move(board, key, color, choice[i])
+            # 递归搜索下一层
+            if not found:
+                n = self._pvs(-color, newboard, deep+1, -beta, -alpha, t, newkey)
             else:
-                return None
-            
-        # MIN层处理（偶数层）
-        else:
-            a = 99999   # 最佳值
-            b = 0       # 最佳移动索引
-            
-            for i in range(len(choice)):
-                # 模拟此移动
-                newboard = self.find_change(board, color, choice[i])
-                # 递归搜索下一层
-                n = self.search(-color, newboard, deep+1, alpha, beta, t)
-                
-                if n is not None:
-                    if n < a:
-                        a = n
-                        b = i
-                    # Beta剪枝
-                    if a <= alpha:
-                        # 存储到转置表
-                        self.transposition_table[board_hash] = (t-deep, a, choice[i] if deep == 1 else None)
-                        if deep == 1:
-                            return choice[i]
-                        return a
-                    beta = min(beta, a)
+                n = self._pvs(-color, newboard, deep+1, -alpha-1, -alpha, t, newkey)
+                # 零窗口搜索失败（可能更好），用完整窗口重新搜索
+                if n is not None and alpha < -n < beta:
+                    n = self._pvs(-color, newboard, deep+1, -beta, -alpha, t, newkey)
+            self._follow_pv = False  # 主要变例只沿第一个子节点继续
+            if n is None:
+                continue
+            n = -n
+            found = True
             
-            # 修复：确保在有合法走法时才返回最佳走法
-            if len(choice) > 0:
-                # 记录结果到转置表
-                self.transposition_table[board_hash] = (t-deep, a, choice[b] if deep == 1 else None)
+            if n > best:
+                best = n
+                b = i
+            # 剪枝
+            if best >= beta:
+                self._record_cutoff(deep, t, choice[i], i)
+                # 存储到转置表：剪枝时的值只是下界
+                self._store(key, t-deep, best, LOWER, choice[i], sym)
                 if deep == 1:
-                    return choice[b]
-                return a
-            else:
-                return None
+                    self.root_move = choice[i]
+                return best
+            alpha = max(alpha, best)
+        
+        # 记录结果到转置表：没有超过初始alpha时只是上界
+        # 排除了部分走法的根节点结果不代表整个局面，不写入转置表
+        if deep > 1 or not self._root_exclude:
+            self._store(key, t-deep, best, EXACT if best > alpha_orig else UPPER, choice[b], sym)
+        if deep == 1:
+            self.root_move = choice[b]
+        return best
+
+    def _probcut(self, color, board, deep, alpha, beta, checks, key):
+        """
+        依次用各组(浅层深度, a, b, sigma)做零窗口浅层搜索：
+        预测的深层值 a*v+b 以threshold个sigma的余量不低于beta时返回beta，不高于alpha时返回alpha，否则返回None
+        """
+        follow_pv = self._follow_pv
+        self._follow_pv = False
+        threshold = self.probcut_threshold
+        try:
+            for shallow, a, b, sigma in checks:
+                if beta < INFINITY:
+                    bound = int(round((beta + threshold * sigma - b) / a))
+                    value = self._pvs(color, board, deep, bound - 1, bound, deep + shallow, key)
+                    if value is None:
+                        return None
+                    if value >= bound:
+                        self.probcut_cuts += 1
+                        return beta
+                if alpha > -INFINITY:
+                    bound = int(round((alpha - threshold * sigma - b) / a))
+                    value = self._pvs(color, board, deep, bound, bound + 1, deep + shallow, key)
+                    if value is None:
+                        return None
+                    if value <= bound:
+                        self.probcut_cuts += 1
+                        return alpha
+        finally:
+            self._follow_pv = follow_pv
+        return None
 
-    def _get_board_hash(self, board):
-        """将棋盘转换为哈希用于转置表"""
-        return tuple(tuple(row) for row in board)
+    def _order_moves(self, choice, deep, tt_move):
+        """
+        走法排序：转置表最佳走法 > 角 > 本层杀手走法 > 历史得分，X位作为同分时的惩罚
+        """
+        killers = self.killers[deep]
+        history = self.history
+        scored = []
+        for move in choice:
+            sq = move[0] * 8 + move[1]
+            score = history[sq]
+            if sq == tt_move:
+                score += ORDER_TT
+            if move in CORNER_SQUARES:
+                score += ORDER_CORNER
+            elif move in killers:
+                score += ORDER_KILLER
+            elif move in X_SQUARES:
+                score -= X_SQUARE_PENALTY
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def _record_cutoff(self, deep, t, move, index):
+        """记录剪枝：更新统计、杀手走法与历史得分"""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        killers = self.killers[deep]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move[0] * 8 + move[1]] += (t - deep) * (t - deep)
+
+    def _probe(self, board, color, key=None):
+        """
+        查询转置表，返回(键值, 对称变换编号, 条目)，条目中的走法已映射回当前局面
+        symmetric_tt为False时键值即传入的Zobrist键值，变换编号为0
+        """
+        if self.symmetric_tt:
+            black, white = board
+            key, sym = symmetry.canonical_hash(black, white, 'X' if color == COLOR_BLACK else 'O')
+        else:
+            if key is None:
+                key = self._get_board_hash(board, color)
+            sym = 0
+        entry = self.transposition_table.probe(key)
+        if sym and entry is not None and entry[3] >= 0:
+            entry = entry[:3] + (symmetry.from_canonical_square(entry[3], sym),)
+        return key, sym, entry
+
+    def _store(self, key, depth, value, flag, move, sym=0):
+        """写入转置表，走法以格子编号保存（对称键值时保存规范代表中的编号）"""
+        self.transposition_table.store(key, depth, value, flag, symmetry.to_canonical_square(move[0] * 8 + move[1], sym))
+
+    def _get_board_hash(self, board, color):
+        """局面（含行棋方）的Zobrist键值，与Board.key一致"""
+        black, white = board
+        return zobrist.hash_position(black, white, 'X' if color == COLOR_BLACK else 'O')
+
+    def _make_move(self, board, key, color, choice):
+        """落子并增量更新键值，返回(新局面, 新键值)"""
+        black, white = board
+        sq = choice[0] * 8 + choice[1]
+        if color == COLOR_BLACK:
+            flipped = bitboard.flips(black, white, sq)
+            newboard = (black | flipped | (1 << sq), white ^ flipped)
+            key ^= zobrist.BLACK[sq]
+        else:
+            flipped = bitboard.flips(white, black, sq)
+            newboard = (black ^ flipped, white | flipped | (1 << sq))
+            key ^= zobrist.WHITE[sq]
+        return newboard, key ^ zobrist.flip_hash(flipped) ^ zobrist.SIDE
 
     def find_change(self, chessboard, color, choice):
-        """使用方向向量优化的落子翻转函数"""
-        # 创建棋盘副本
-        change = [row[:] for row in chessboard]  # 深拷贝二维列表
-        x, y = choice
-        change[x][y] = color  # 在选定位置放置棋子
-        
-        # 检查8个方向
-        for dx, dy in DIRECTIONS:
-            # 确认第一个相邻位置是对手棋子
-            nx, ny = x + dx, y + dy
-            if not (0 <= nx < self.chessboard_size and 0 <= ny < self.chessboard_size):
-                continue
-            if chessboard[nx][ny] != -color:
-                continue
-            
-            # 沿该方向查找自己的棋子
-            x_temp, y_temp = nx + dx, ny + dy
-            can_flip = False
-            
-            while 0 <= x_temp < self.chessboard_size and 0 <= y_temp < self.chessboard_size:
-                if chessboard[x_temp][y_temp] == 0:  # 遇到空位
-                    break
-                if chessboard[x_temp][y_temp] == color:  # 找到自己的棋子
-                    can_flip = True
-                    break
-                x_temp += dx
-                y_temp += dy
-            
-            # 如果找到封闭序列，翻转中间所有对手棋子
-            if can_flip:
-                flip_x, flip_y = nx, ny
-                while flip_x != x_temp or flip_y != y_temp:
-                    change[flip_x][flip_y] = color
-                    flip_x += dx
-                    flip_y += dy
-        
-        return change
+        """落子并翻转，翻转的棋子由bitboard的查表翻转函数得到"""
+        black, white = chessboard
+        sq = choice[0] * 8 + choice[1]
+        if color == COLOR_BLACK:
+            flipped = bitboard.flips(black, white, sq)
+            return black | flipped | (1 << sq), white ^ flipped
+        flipped = bitboard.flips(white, black, sq)
+        return black ^ flipped, white | flipped | (1 << sq)
 
     def find_choice(self, chessboard, color):
-        """使用方向向量优化的合法走法查找"""
-        choices = []
-        # 遍历棋盘
-        for i in range(self.chessboard_size):
-            for j in range(self.chessboard_size):
-                # 只考虑空位置
-                if chessboard[i][j] != 0:
-                    continue
-                
-                is_valid = False
-                # 检查8个方向
-                for dx, dy in DIRECTIONS:
-                    # 检查第一个相邻位置是否是对手颜色
-                    nx, ny = i + dx, j + dy
-                    if not (0 <= nx < self.chessboard_size and 0 <= ny < self.chessboard_size):
-                        continue
-                    if chessboard[nx][ny] != -color:
-                        continue
-                    
-                    # 沿该方向查找自己的棋子
-                    x_temp, y_temp = nx + dx, ny + dy
-                    while 0 <= x_temp < self.chessboard_size and 0 <= y_temp < self.chessboard_size:
-                        if chessboard[x_temp][y_temp] == 0:  # 遇到空位
-                            break
-                        if chessboard[x_temp][y_temp] == color:  # 找到自己的棋子
-                            choices.append((i, j))
-                            is_valid = True
-                            break
-                        x_temp += dx
-                        y_temp += dy
-                    
-                    if is_valid:
-                        break  # 只要有一个方向符合条件就可以了
-        
-        return choices
+        """位棋盘实现的合法走法查找，按行扫描顺序返回"""
+        black, white = chessboard
+        if color == COLOR_BLACK:
+            return bitboard.to_coords(bitboard.legal_moves(black, white))
+        return bitboard.to_coords(bitboard.legal_moves(white, black))
 
     def assess(self, board):
-        """评估函数，保持原有策略同时优化计算"""
-        # 位置权重表
-        assess = [
-            [2000, -60,  300, 200, 200, 300, -60,  2000],
-            [-60, -400,    1,   1,   1,   1, -400,  -60],
-            [300,    1,   10,   5,   5,  10,    1,  300],
-            [200,    1,    5,   3,   3,   5,    1,  200],
-            [200,    1,    5,   3,   3,   5,    1,  200],
-            [300,    1,   10,   5,   5,  10,    1,  300],
-            [-60, -400,    1,   1,   1,   1, -400,  -60],
-            [2000, -60,  300, 200, 200, 300, -60,  2000]
-        ]
-        
-        # 计算已占用格子数量
-        status = sum(1 for i in range(8) for j in range(8) if board[i][j] != 0)
-        
-        # 角落已占领时的特殊调整
-        if board[0][0] != 0:
-            if board[0][1] == board[0][0]:
-                assess[0][1] = 400
-            if board[1][0] == board[0][0]:
-                assess[1][0] = 400
-            if board[0][1] == board[0][0] and board[1][0] == board[0][0] and board[1][1] == board[0][0]:
-                assess[1][1] = 100
-                
-        if board[0][7] != 0:
-            if board[0][6] == board[0][7]:
-                assess[0][6] = 400
-            if board[1][7] == board[0][7]:
-                assess[1][7] = 400
-            if board[0][6] == board[0][7] and board[1][7] == board[0][7] and board[1][6] == board[0][7]:
-                assess[1][6] = 100
-                
-        if board[7][0] != 0:
-            if board[6][0] == board[7][0]:
-                assess[6][0] = 400
-            if board[7][1] == board[7][0]:
-                assess[7][1] = 400
-            if board[6][0] == board[7][0] and board[7][1] == board[7][0] and board[6][1] == board[7][0]:
-                assess[6][1] = 100
-                
-        if board[7][7] != 0:
-            if board[6][7] == board[7][7]:
-                assess[6][7] = 400
-            if board[7][6] == board[7][7]:
-                assess[7][6] = 400
-            if board[7][6] == board[7][7] and board[6][7] == board[7][7] and board[6][6] == board[7][7]:
-                assess[6][6] = 100
-                
-        # 游戏后期策略调整
-        if status > 60:
-            assess = [[500 for _ in range(8)] for _ in range(8)]
-
-        # 计算总评分
-        result_sum = 0
-        for i in range(8):
-            for j in range(8):
-                result_sum += assess[i][j] * board[i][j]
-                
-        # 根据AI颜色调整分数
-        if self.color == -1:
-            result_sum = -result_sum
-            
-        return result_sum
\ No newline at end of file
+        """评估函数：模式查表与行动力，返回以self.color为视角的估值"""
+        black, white = board
+        if self.color == COLOR_BLACK:
+            return self.evaluator.evaluate(black, white)
+        return self.evaluator.evaluate(white, black)
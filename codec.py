@@ -0,0 +1,48 @@
+import struct
+import numpy as np
+from board import Board
+
+'''
+局面的紧凑二进制编码
+每个局面固定17字节：黑棋掩码(8字节) + 白棋掩码(8字节) + 行棋方(1字节，0为黑棋，1为白棋)
+整数均为小端序
+'''
+
+POSITION_BYTES = 17
+POSITION_DTYPE = np.dtype([('black', '<u8'), ('white', '<u8'), ('side', 'u1')])  # 无对齐填充，正好17字节
+_STRUCT = struct.Struct('<QQB')
+
+
+def encode(board):
+    '''
+    单个局面编码为17字节
+    '''
+    return _STRUCT.pack(board.black, board.white, 0 if board.color == 'X' else 1)
+
+
+def decode(data):
+    '''
+    17字节解码为Board
+    '''
+    black, white, side = _STRUCT.unpack(bytes(data))
+    return Board.from_masks(black, white, 'X' if side == 0 else 'O')
+
+
+def encode_many(boards):
+    '''
+    一组局面编码为(N, 17)的连续uint8数组
+    '''
+    records = np.array([(board.black, board.white, 0 if board.color == 'X' else 1) for board in boards],
+                       dtype=POSITION_DTYPE)
+    return records.view(np.uint8).reshape(-1, POSITION_BYTES)
+
+
+def decode_many(data):
+    '''
+    (N, 17)的uint8数组（或等长的bytes）解码为Board列表
+    '''
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(data, dtype=np.uint8)
+    records = np.ascontiguousarray(data, dtype=np.uint8).reshape(-1).view(POSITION_DTYPE)
+    return [Board.from_masks(int(black), int(white), 'X' if side == 0 else 'O')
+            for black, white, side in zip(records['black'], records['white'], records['side'])]
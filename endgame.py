@@ -0,0 +1,173 @@
+import bitboard
+from bitboard import FULL, legal_moves, flips, popcount
+
+'''
+残局精确求解：在剩余空格较少时穷尽搜索到终局
+基于位棋盘的负极大值Alpha-Beta，走法按奇偶性与"最快优先"（对手行动力最少优先）排序
+'''
+
+# 四个象限的掩码，用于奇偶性排序：剩余空格为奇数的区域优先落子
+QUADRANTS = [0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+
+# 静态格子优先级：角最优先，X位和C位最后
+SQUARE_PRIORITY = [
+    9, 2, 7, 6, 6, 7, 2, 9,
+    2, 0, 3, 4, 4, 3, 0, 2,
+    7, 3, 5, 5, 5, 5, 3, 7,
+    6, 4, 5, 1, 1, 5, 4, 6,
+    6, 4, 5, 1, 1, 5, 4, 6,
+    7, 3, 5, 5, 5, 5, 3, 7,
+    2, 0, 3, 4, 4, 3, 0, 2,
+    9, 2, 7, 6, 6, 7, 2, 9,
+]
+
+FASTEST_FIRST_EMPTIES = 7   # 剩余空格多于此数时使用最快优先排序
+
+
+def final_score(p, o):
+    '''
+    终局得分：当前玩家与对方的棋子差，剩余空格归胜方
+    '''
+    own = popcount(p)
+    opp = popcount(o)
+    empties = 64 - own - opp
+    if own > opp:
+        return own - opp + empties
+    if own < opp:
+        return own - opp - empties
+    return 0
+
+
+class EndgameSolver(object):
+    '''
+    残局求解器
+    '''
+    def __init__(self, max_empties=12, exact=True):
+        '''
+        参数:
+            max_empties: 剩余空格不超过此数时启用求解
+            exact: True为精确棋子差求解，False只求胜/负/平
+        '''
+        self.max_empties = max_empties
+        self.exact = exact
+        self.nodes = 0
+
+    def applicable(self, p, o):
+        '''
+        当前局面是否应交给残局求解器
+        '''
+        return 64 - popcount(p | o) <= self.max_empties
+
+    def board_move(self, board):
+        '''
+        对Board对象求解：进入残局范围且有子可下时返回最佳走法坐标(i, j)，否则返回None
+        '''
+        p, o = board.sides()
+        if not self.applicable(p, o):
+            return None
+        sq, _ = self.best_move(p, o)
+        if sq < 0:
+            return None
+        return divmod(sq, 8)
+
+    def best_move(self, p, o):
+        '''
+        求当前玩家的最佳走法
+        返回(格子编号, 得分)，无子可下时格子编号为-1
+        精确模式下得分为终局棋子差，胜负模式下为1/0/-1
+        '''
+        self.nodes = 0
+        moves = legal_moves(p, o)
+        if not moves:
+            return -1, -self._search(o, p, -64, 64, True) if self.exact else -self._wld(o, p, True)
+        if self.exact:
+            alpha, beta = -65, 65
+        else:
+            alpha, beta = -2, 2
+        best_sq = -1
+        for sq in self._order(p, o, moves):
+            f = flips(p, o, sq)
+            if self.exact:
+                v = -self._search(o ^ f, p | f | (1 << sq), -beta, -alpha, False)
+            else:
+                v = -self._wld(o ^ f, p | f | (1 << sq), False)
+            if v > alpha:
+                alpha = v
+                best_sq = sq
+                if not self.exact and v > 0:
+                    break
+        return best_sq, alpha
+
+    def solve(self, p, o):
+        '''
+        当前局面在双方完美走法下的得分（当前玩家视角）
+        '''
+        self.nodes = 0
+        if self.exact:
+            return self._search(p, o, -64, 64, False)
+        return self._wld(p, o, False)
+
+    def _wld(self, p, o, passed):
+        '''
+        胜/负/平求解：零宽度附近的窗口搜索，返回1/0/-1
+        '''
+        v = self._search(p, o, -1, 1, passed)
+        return (v > 0) - (v < 0)
+
+    def _order(self, p, o, moves):
+        '''
+        走法排序：剩余空格多时按对手行动力从少到多（最快优先），
+        否则按所在区域空格数的奇偶性和格子静态优先级
+        '''
+        empty = ~(p | o) & FULL
+        odd = 0
+        for q in QUADRANTS:
+            if popcount(empty & q) & 1:
+                odd |= q
+        squares = list(bitboard.squares(moves))
+        if popcount(empty) > FASTEST_FIRST_EMPTIES and len(squares) > 1:
+            scored = []
+            for sq in squares:
+                f = flips(p, o, sq)
+                mobility = popcount(legal_moves(o ^ f, p | f | (1 << sq)))
+                scored.append((mobility * 16 - ((odd >> sq) & 1) * 8 - SQUARE_PRIORITY[sq], sq))
+            scored.sort()
+            return [sq for _, sq in scored]
+        squares.sort(key=lambda sq: (-((odd >> sq) & 1), -SQUARE_PRIORITY[sq]))
+        return squares
+
+    def _search(self, p, o, alpha, beta, passed):
+        '''
+        精确求解的负极大值Alpha-Beta搜索
+        '''
+        self.nodes += 1
+        empty = ~(p | o) & FULL
+
+        # 只剩一个空格：直接计算
+        if empty and not empty & (empty - 1):
+            sq = empty.bit_length() - 1
+            f = flips(p, o, sq)
+            if f:
+                return final_score(p | f | empty, o ^ f)
+            f = flips(o, p, sq)
+            if f:
+                return final_score(p ^ f, o | f | empty)
+            return final_score(p, o)
+
+        moves = legal_moves(p, o)
+        if not moves:
+            if passed or not empty:
+                return final_score(p, o)
+            return -self._search(o, p, -beta, -alpha, True)
+
+        best = -65
+        for sq in self._order(p, o, moves):
+            f = flips(p, o, sq)
+            v = -self._search(o ^ f, p | f | (1 << sq), -beta, -alpha, False)
+            if v > best:
+                best = v
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+        return best
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+import numpy as np
+import batch_board
+import zobrist
+from symmetry import canonical_hash, transform_planes, inverse_planes
+
+'''
+神经网络评估的LRU缓存，放在Mcts_plus与PolicyValueNet之间
+网络的输入只有(当前玩家棋子, 对方棋子)两个平面，因此以这两个位棋盘的Zobrist键值为键（与黑白哪方行棋无关），
+缓存(8x8的落子概率, 价值)；同一步内、各步之间以及各局自我对弈之间重复出现的局面直接返回缓存结果
+symmetric=True时以8种对称变换下的规范代表为键，落子概率以规范代表的方向存放，取出时再变换回原局面
+网络的version（每次train_step后加1）变化时清空缓存
+'''
+
+
+class EvalCache(object):
+    '''
+    策略价值网络的评估缓存
+    policy_value_fn与policy_value的接口与PolicyValueNet相同，可以直接替换传给AIPlayerplus/Mcts_plus
+    '''
+    def __init__(self, policy_value_net, capacity=100000, symmetric=False):
+        '''
+        参数:
+            policy_value_net: 提供policy_value_fn(board)与policy_value(states)的网络，如PolicyValueNet
+            capacity: 缓存的最大局面数，超出时淘汰最久未使用的局面
+            symmetric: 是否让对称的局面共用缓存
+        '''
+        self.net = policy_value_net
+        self.capacity = capacity
+        self.symmetric = symmetric
+        self.entries = OrderedDict()   # 键值 -> (落子概率, 价值)
+        self.version = getattr(policy_value_net, 'version', 0)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        '''
+        命中统计：{'hits', 'misses', 'hit_rate', 'size'}
+        '''
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate, 'size': len(self.entries)}
+
+    def clear(self):
+        '''
+        清空缓存（命中统计保留）
+        '''
+        self.entries.clear()
+
+    def _check_version(self):
+        version = getattr(self.net, 'version', 0)
+        if version != self.version:
+            self.version = version
+            self.entries.clear()
+
+    def _key(self, p, o):
+        '''
+        返回(键值, 对称变换编号)，不使用对称时变换编号为0
+        '''
+        if self.symmetric:
+            return canonical_hash(p, o, 'X')
+        return zobrist.hash_position(p, o, 'X'), 0
+
+    def _get(self, key, s):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        probs, value = entry
+        return (inverse_planes(probs, s) if s else probs), value
+
+    def _put(self, key, s, probs, value):
+        self.entries[key] = ((transform_planes(probs, s) if s else probs), value)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def policy_value_fn(self, board):
+        '''
+        单个局面的评估，返回(8x8的落子概率, 价值)
+        '''
+        self._check_version()
+        key, s = self._key(*board.sides())
+        entry = self._get(key, s)
+        if entry is not None:
+            return entry
+        probs, value = self.net.policy_value_fn(board)
+        self._put(key, s, probs, value)
+        return probs, value
+
+    def policy_value(self, state_batch):
+        '''
+        批量评估(N, 2, 8, 8)的局面，返回((N, 64)的落子概率, (N, 1)的价值)；只把未命中的局面送入网络
+        '''
+        self._check_version()
+        states = np.asarray(state_batch)
+        positions = batch_board.pack(states)
+        n = len(states)
+        probs = np.empty((n, 64), dtype=np.float32)
+        values = np.empty((n, 1), dtype=np.float32)
+        keys = []
+        missing = []
+        for i in range(n):
+            key, s = self._key(int(positions[i, 0]), int(positions[i, 1]))
+            keys.append((key, s))
+            entry = self._get(key, s)
+            if entry is None:
+                missing.append(i)
+            else:
+                probs[i] = np.ravel(entry[0])
+                values[i] = entry[1]
+        if missing:
+            new_probs, new_values = self.net.policy_value(states[missing])
+            new_values = np.ravel(new_values)
+            for k, i in enumerate(missing):
+                probs[i] = new_probs[k]
+                values[i] = new_values[k]
+                key, s = keys[i]
+                self._put(key, s, np.reshape(new_probs[k], (8, 8)), new_values[k])
+        return probs, values
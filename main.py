@@ -44,6 +44,13 @@ def select_player(player_name_prompt):
             print("将使用人类玩家作为后备。")
             return HumanPlayer() # Fallback to HumanPlayer
     elif choice == 3: # 传统算法 AI
+        time_limit_str = input("请输入传统算法每步思考时间/秒 (留空则按固定深度搜索): ")
+        try:
+            time_limit = float(time_limit_str) if time_limit_str else None
+        except ValueError:
+            time_limit = None
+        if time_limit:
+            return ChessAIPlayer(time_limit=time_limit)
         search_depth_str = input("请输入传统算法搜索深度 (推荐: 4, 默认: 4): ")
         search_depth = int(search_depth_str) if search_depth_str.isdigit() else 4
         return ChessAIPlayer(search_depth)
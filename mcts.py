@@ -1,243 +1,335 @@
 import math
-import copy
 import random
-from board import Board
+import numpy as np
+import bitboard
+import batch_board
 
 '''
 蒙特卡洛树搜索算法 - 纯MCTS实现版本
+搜索树以结构数组（每种统计量一个NumPy数组）存放，节点只是数组下标，不保存局面；
+局面由工作棋盘沿选择路径落子得到，每次迭代结束后撤销回根节点
 '''
 
-class Node(object):
+NOT_EXPANDED = -1   # first_child的取值：尚未生成子节点
+TERMINAL = -2       # first_child的取值：终局节点，没有子节点
+PASS = -1           # move的取值：跳过回合
+
+
+def random_rollout(p, o):
     '''
-    蒙特卡洛树搜索节点
+    直接在位棋盘上从局面(p, o)随机下完一局，返回p一方的胜负：赢为1，平为0，输为-1
     '''
-    def __init__(self):
-        '''
-        节点属性初始化
-        '''
-        # 基础属性
-        self.color = None           # 节点代表的玩家颜色
-        self.board = Board()        # 节点对应的棋盘状态
-        self.coordinate = None      # 到达此节点的落子位置
-        self.visit = 0              # 访问次数
-        self.score = 0              # 得分: 黑棋赢为+1分，平为0分，白棋赢为-1分
-        
-        # 树结构相关
-        self.parent = None          # 父节点
-        self.child = []             # 子节点列表
-        self.childnodes = []        # 子节点落子位置列表
-        self.next_locations = None  # 从当前节点可行的落子位置
-        self.status = 0             # 扩展状态: 0=未完全扩展, 1=完全扩展
-    
+    sign = 1
+    passed = False
+    while True:
+        moves = bitboard.legal_moves(p, o)
+        if moves:
+            passed = False
+            squares = list(bitboard.squares(moves))
+            sq = squares[random.randint(0, len(squares)-1)]
+            flipped = bitboard.flips(p, o, sq)
+            p, o = o ^ flipped, p | flipped | (1 << sq)
+        elif passed:
+            break
+        else:
+            passed = True
+            p, o = o, p
+        sign = -sign
+    diff = bitboard.popcount(p) - bitboard.popcount(o)
+    return sign * ((diff > 0) - (diff < 0))
+
+
+class NodePool(object):
+    '''
+    数组存储的节点池
+    同一节点的全部子节点连续存放，由first_child和n_children定位；容量不足时按倍数扩容
+    '''
+    # (数组名, 数据类型, 初始值)
+    FIELDS = (
+        ('visits', np.int32, 0),              # 访问次数
+        ('scores', np.float64, 0),            # 累计得分，以走到此节点的一方为视角：赢为+1，平为0，输为-1（批量模拟时累加平均结果）
+        ('parent', np.int32, -1),             # 父节点
+        ('first_child', np.int32, NOT_EXPANDED),  # 第一个子节点
+        ('n_children', np.int16, 0),          # 子节点数
+        ('move', np.int8, PASS),              # 到达此节点的落子（格子编号 i*8+j）
+        ('prior', np.float32, 0),             # 先验概率，纯MCTS中为均匀分布
+    )
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        for name, dtype, fill in self.FIELDS:
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+
+    @property
+    def capacity(self):
+        return len(self.visits)
+
+    def bytes_per_node(self):
+        '''
+        每个节点占用的字节数
+        '''
+        return sum(getattr(self, name).itemsize for name, _, _ in self.FIELDS)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype, fill in self.FIELDS:
+            array = np.full(capacity, fill, dtype=dtype)
+            array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+
+    def reset(self):
+        '''
+        清空节点池，只保留一个根节点（下标0）
+        '''
+        for name, _, fill in self.FIELDS:
+            getattr(self, name)[:self.size] = fill
+        self.size = 1
+
+    def subtree(self, node):
+        '''
+        把以node为根的子树复制到一个新的节点池，node成为新池的根节点（下标0），返回新池
+        '''
+        pool = NodePool(self.capacity)
+        pool.size = 1
+        for name, _, _ in self.FIELDS:
+            getattr(pool, name)[0] = getattr(self, name)[node]
+        pool.parent[0] = -1
+        stack = [(node, 0)]
+        while stack:
+            old, new = stack.pop()
+            first = int(self.first_child[old])
+            if first < 0:
+                pool.first_child[new] = first
+                continue
+            n = int(self.n_children[old])
+            start = pool.add_children(new, self.move[first:first + n])
+            for name in ('visits', 'scores', 'n_children', 'prior'):
+                getattr(pool, name)[start:start + n] = getattr(self, name)[first:first + n]
+            stack.extend((first + k, start + k) for k in range(n))
+        return pool
+
+    def add_children(self, node, moves):
+        '''
+        为node一次性分配全部子节点，返回第一个子节点的下标
+        '''
+        n = len(moves)
+        start = self.size
+        if start + n > self.capacity:
+            self._grow(start + n)
+        end = start + n
+        self.parent[start:end] = node
+        self.move[start:end] = moves
+        self.prior[start:end] = 1.0 / n
+        self.first_child[node] = start
+        self.n_children[node] = n
+        self.size = end
+        return start
+
 
 class Mcts(object):
     '''
     蒙特卡洛树搜索的实现
     '''
-    
-    def __init__(self, board, r):
+
+    def __init__(self, board, r, c=1/math.sqrt(2), rollouts_per_leaf=1):
         '''
         初始化MCTS搜索器
-        
+
         参数:
             board: 当前棋盘状态
             r: 搜索模拟次数
+            c: UCB1的探索常数
+            rollouts_per_leaf: 每个叶节点的随机模拟局数，大于1时批量模拟并以平均结果反向传播
         '''
-        self.color = board.color 
-        self.board = copy.deepcopy(board)
+        self.color = board.color
+        self.board = board.clone()  # 工作棋盘，搜索时通过落子/撤销在树上移动
         self.r = r    # 迭代次数
-        
-    def ucb1(self, node, c=1/math.sqrt(2)):
+        self.c = c
+        self.rollouts_per_leaf = rollouts_per_leaf
+        self.rng = np.random.default_rng(random.getrandbits(32))  # 批量模拟的随机数发生器，由random的种子决定
+        self.undo_stack = []        # 从根节点到当前节点的撤销记录
+        self.tree = NodePool(max(64, 16 * r))
+
+    def ucb1(self, node, first, n):
         '''
-        计算UCB1值，平衡探索与利用
-        
-        参数:
-            node: 要评估的节点
-            c: 探索常数
-        '''
-        # UCB1公式: Q(v)/N(v) + c*sqrt(2*ln(N(p))/N(v))
-        # Q(v) = 节点总得分
-        # N(v) = 节点访问次数
-        # N(p) = 父节点访问次数
-        return node.score/node.visit + c*math.sqrt(2*math.log(node.parent.visit)/node.visit)
-        
-    def selection(self, node):
-        '''
-        选择阶段: 根据UCB1值选择最有前途的节点
-        '''
-        selection_node = node
-        # 当节点已完全扩展且有子节点时，选择UCB1值最高的子节点
-        while selection_node.status == 1 and selection_node.child:
-            best_child_value = -float('inf')
-            best_child = None
-            
-            for child in selection_node.child:
-                ucb_value = self.ucb1(child)
-                if ucb_value > best_child_value:
-                    best_child_value = ucb_value
-                    best_child = child
-                    
-            selection_node = best_child
-            
-        return selection_node
-        
-    def expand(self, node):
+        计算node全部子节点（下标first起的n个）的UCB1值（向量化）
+        UCB1公式: Q(v)/N(v) + c*sqrt(2*ln(N(p))/N(v))
+        '''
+        tree = self.tree
+        visits = tree.visits[first:first + n]
+        return tree.scores[first:first + n] / visits + self.c * np.sqrt(2 * math.log(tree.visits[node]) / visits)
+
+    def selection(self):
+        '''
+        选择与扩展阶段: 从根节点出发，子节点都访问过时选择UCB1值最高的子节点，
+        否则取下一个未访问的子节点作为新叶节点；到达终局节点时停止
+        子节点在分配时已随机打乱，按顺序访问即等同于随机选择未访问的子节点
+        沿途在工作棋盘上落子，撤销记录压入undo_stack
+        返回(路径上的节点, 各节点走到此处一方的符号：黑棋为1，白棋为-1，根节点为0)
         '''
-        扩展阶段: 从未扩展的动作中随机选择一个创建新节点
-        '''
-        # 找出所有未扩展的候选位置
-        unexpanded_coordinates = []
-        for pos in node.next_locations:
-            if pos not in node.childnodes:
-                unexpanded_coordinates.append(pos)
-        
-        # 如果只剩一个未扩展位置，标记为完全扩展
-        if len(unexpanded_coordinates) == 1:
-            node.status = 1
-            
-        # 随机选择一个未扩展位置
-        random_seed = random.randint(0, len(unexpanded_coordinates)-1)
-        expand_node_coordinate = unexpanded_coordinates[random_seed]
-        
-        # 创建新节点
-        expand_node = Node()
-        
-        # 设置新节点颜色
-        if node.parent is None:  # 根节点，扩展的子节点颜色相同
-            expand_node.color = self.color
-        else:  # 切换颜色
-            expand_node.color = 'O' if node.color == 'X' else 'X'
-            
-        # 设置节点属性
-        expand_node.parent = node
-        expand_node.coordinate = expand_node_coordinate
-        
-        # 更新父节点
-        node.childnodes.append(expand_node_coordinate)
-        node.child.append(expand_node)
-        
-        return expand_node
-       
-    def simulation(self, node):
-        '''
-        模拟阶段: 从当前节点快速随机模拟到游戏结束
-        '''
-        # 创建棋盘副本
-        board_simulation = copy.deepcopy(node.board)
-        switch = 0  # 双方连续不能下子的计数
-        
-        # 随机模拟直到游戏结束
-        while switch < 2:
-            available_moves = board_simulation.locations()
-            if not available_moves:  # 无子可走
-                switch += 1
+        tree = self.tree
+        node = 0
+        path = [0]
+        signs = [0]
+        while True:
+            first = int(tree.first_child[node])
+            if first == NOT_EXPANDED:
+                first = self.expand(node)
+            if first == TERMINAL:
+                break
+            n = int(tree.n_children[node])
+            # 非根节点自身被模拟过一次，其余访问次数依次用于访问子节点
+            k = int(tree.visits[node]) - (node != 0)
+            if k < n:
+                child = first + k
             else:
-                # 随机选择一步棋
-                random_move = available_moves[random.randint(0, len(available_moves)-1)]
-                board_simulation.reversi_pieces(random_move)
-                switch = 0  # 重置计数器
-                
-            # 切换玩家
-            board_simulation.color = 'O' if board_simulation.color == 'X' else 'X'
-        
-        # 计算胜负
-        board_simulation.pieces_index()
-        return board_simulation.win()
-       
-    def back_update(self, node):
-        '''
-        反向传播阶段: 更新节点及其祖先节点的统计信息
-        '''
-        current_score = node.score
-        current_node = node
-        
-        while current_node.parent:
-            current_node.parent.visit += 1
-            # 分数在不同层级间反转，因为是零和游戏
-            current_score = -current_score
-            current_node.parent.score += current_score
-            current_node = current_node.parent
-            
+                child = first + int(np.argmax(self.ucb1(node, first, n)))
+            move = int(tree.move[child])
+            signs.append(1 if self.board.color == 'X' else -1)
+            self.undo_stack.append(self.board.play(None if move == PASS else divmod(move, 8)))
+            path.append(child)
+            if k < n:
+                break
+            node = child
+        return path, signs
+
+    def expand(self, node):
+        '''
+        扩展阶段: 为工作棋盘当前局面（即node）生成全部子节点（随机顺序），返回第一个子节点的下标
+        无子可下但对方可下时生成一个跳过回合的子节点，双方都无子可下时标记为终局
+        '''
+        moves = self.board.legal_moves()
+        if moves:
+            moves = list(bitboard.squares(moves))
+            random.shuffle(moves)
+            return self.tree.add_children(node, moves)
+        if self.board.is_game_over():
+            self.tree.first_child[node] = TERMINAL
+            return TERMINAL
+        return self.tree.add_children(node, [PASS])
+
+    def simulation(self):
+        '''
+        模拟阶段: 从工作棋盘所在局面随机模拟到游戏结束，rollouts_per_leaf大于1时同时模拟多局取平均
+        返回结果：黑棋赢为1，平为0，白棋赢为-1
+        '''
+        p, o = self.board.sides()
+        if self.rollouts_per_leaf > 1:
+            positions = np.empty((self.rollouts_per_leaf, 2), dtype='<u8')
+            positions[:, 0] = p
+            positions[:, 1] = o
+            result = float(np.mean(np.sign(batch_board.random_playouts(positions, self.rng))))
+        else:
+            result = random_rollout(p, o)
+        return result if self.board.color == 'X' else -result
+
+    def rewind(self):
+        '''
+        撤销undo_stack中的所有落子，使工作棋盘回到根节点局面
+        '''
+        while self.undo_stack:
+            self.board.undo(self.undo_stack.pop())
+
+    def back_update(self, path, signs, result):
+        '''
+        反向传播阶段: 路径上每个节点访问次数加1，得分按走到该节点一方的视角累加
+        '''
+        path = np.array(path)
+        self.tree.visits[path] += 1
+        self.tree.scores[path] += result * np.array(signs)
+
     def mcts_run(self):
         '''
         执行完整的MCTS搜索过程
-        
+
         返回:
             最佳行动坐标 (i,j)
         '''
-        # 创建根节点
-        root = Node()
-        root.color = self.color
-        root.board = self.board
-        root.board.color = root.color
-        root.next_locations = root.board.locations()
-        
+        self.board.color = self.color
+
         # 检查是否有合法落子
-        if not root.next_locations:
+        if not self.board.locations():
             return None
-        
-        # 第一次扩展
-        expand_node = self.expand(root)
-        
-        # 创建并更新扩展节点的棋盘状态
-        board_copy = copy.deepcopy(self.board)
-        board_copy.reversi_pieces(expand_node.coordinate)
-        expand_node.board = board_copy
-        expand_node.visit = 1
-        
-        # 设置正确的棋盘颜色并模拟
-        opponent_color = 'O' if expand_node.color == 'X' else 'X'
-        expand_node.board.color = opponent_color
-        
-        # 根据颜色正确处理模拟结果
-        if expand_node.color == 'X':
-            expand_node.score = self.simulation(expand_node)
-        else:
-            expand_node.score = -self.simulation(expand_node)
-            
-        # 更新扩展节点的可行位置
-        expand_node.next_locations = expand_node.board.locations()
-        
-        # 反向传播
-        self.back_update(expand_node)
-        
-        # 主搜索循环
-        iterations = 0
-        while iterations < self.r and expand_node.next_locations:
-            iterations += 1
-            
-            # 选择-扩展-模拟-反向传播
-            selection_node = self.selection(root)
-            expand_node = self.expand(selection_node)
-            
-            # 创建并更新扩展节点的棋盘状态
-            board_copy = copy.deepcopy(selection_node.board)
-            board_copy.reversi_pieces(expand_node.coordinate)
-            expand_node.board = board_copy
-            expand_node.visit = 1
-            
-            # 设置正确的棋盘颜色并模拟
-            opponent_color = 'O' if expand_node.color == 'X' else 'X'
-            expand_node.board.color = opponent_color
-            
-            # 根据颜色正确处理模拟结果
-            if expand_node.color == 'X':
-                expand_node.score = self.simulation(expand_node)
-            else:
-                expand_node.score = -self.simulation(expand_node)
-                
-            # 更新扩展节点的可行位置
-            expand_node.next_locations = expand_node.board.locations()
-            
-            # 反向传播
-            self.back_update(expand_node)
-        
+
+        # 创建根节点；advance移到重用的子树时沿用其中的统计，只补足到r次
+        if self.tree.size == 0:
+            self.tree.reset()
+
+        # 选择-扩展-模拟-反向传播
+        for _ in range(max(self.r - int(self.tree.visits[0]), 1)):
+            path, signs = self.selection()
+            result = self.simulation()
+            self.rewind()
+            self.back_update(path, signs, result)
+
         # 选择访问次数最多的动作
-        action = None
-        max_visit = 0
-        for child in root.child:
-            if child.visit > max_visit:
-                max_visit = child.visit
-                action = child.coordinate
-                
-        return action
\ No newline at end of file
+        tree = self.tree
+        first = tree.first_child[0]
+        best = first + int(np.argmax(tree.visits[first:first + tree.n_children[0]]))
+        return divmod(int(tree.move[best]), 8)
+
+    def advance(self, board, depth=2):
+        '''
+        把根节点移到与board局面相同的后代节点（通常为己方走法之后对方应着的孙节点），保留其子树的统计
+        找到时返回True，之后mcts_run在该子树上继续搜索；找不到返回False
+        '''
+        node = self._find(0, board, depth) if self.tree.size else None
+        if node is None:
+            return False
+        tree = self.tree.subtree(node)
+        # 根节点的访问次数只计经过它访问子节点的次数（见selection）
+        first = int(tree.first_child[0])
+        tree.visits[0] = tree.visits[first:first + tree.n_children[0]].sum() if first >= 0 else 0
+        self.tree = tree
+        self.color = board.color
+        self.board = board.clone()
+        return True
+
+    def _find(self, node, board, depth):
+        '''
+        在工作棋盘上沿子节点逐层落子，查找局面与board相同的节点
+        '''
+        if self.board.black == board.black and self.board.white == board.white and self.board.color == board.color:
+            return node
+        first = int(self.tree.first_child[node])
+        if depth == 0 or first < 0:
+            return None
+        for child in range(first, first + int(self.tree.n_children[node])):
+            move = int(self.tree.move[child])
+            self.undo_stack.append(self.board.play(None if move == PASS else divmod(move, 8)))
+            found = self._find(child, board, depth - 1)
+            self.board.undo(self.undo_stack.pop())
+            if found is not None:
+                return found
+        return None
+
+    def root_children(self):
+        '''
+        mcts_run之后根节点各子节点的统计：[(落子坐标, 访问次数, 累计得分), ...]，得分以根节点行棋方为视角
+        '''
+        tree = self.tree
+        first = int(tree.first_child[0])
+        if first < 0:
+            return []
+        return [(divmod(int(tree.move[c]), 8), int(tree.visits[c]), float(tree.scores[c]))
+                for c in range(first, first + int(tree.n_children[0]))]
+
+
+def benchmark(rollouts=(1, 8, 32, 64), r=100, seed=0):
+    '''
+    比较不同rollouts_per_leaf下从初始局面搜索的速度：每秒叶节点数与每秒随机模拟局数
+    '''
+    import time
+    from board import Board
+    for k in rollouts:
+        random.seed(seed)
+        start = time.time()
+        Mcts(Board(), r, rollouts_per_leaf=k).mcts_run()
+        elapsed = time.time() - start
+        print(f"rollouts_per_leaf: {k:3d}  叶节点/秒: {r / elapsed:7.0f}  模拟局数/秒: {r * k / elapsed:7.0f}")
+
+
+if __name__ == '__main__':
+    benchmark()
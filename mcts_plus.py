@@ -1,8 +1,6 @@
 import math
-import copy
 import numpy as np
 import random
-from board import Board
 
 '''
 采用神经网络改进探索策略的蒙特卡洛树搜索
@@ -23,7 +21,6 @@ class Node_plus(object):
     def __init__(self):
         # 基础属性
         self.color = None           # 节点代表的玩家颜色
-        self.board = Board()        # 节点对应的棋盘状态
         self.candidate = None       # 到达此节点的落子位置
         self.visit = 0              # 访问次数
         self.score = 0              # 得分: 黑棋赢为+1分，平为0分，白棋赢为-1分
@@ -45,7 +42,8 @@ class Mcts_plus(object):
     神经网络增强的蒙特卡洛树搜索
     '''
     
-    def __init__(self, board, policy_value_function, r=400, is_selfplay=0, c_puct=1/math.sqrt(2)):
+    def __init__(self, board, policy_value_function, r=400, is_selfplay=0, c_puct=1/math.sqrt(2), root_noise=0,
+                 batch_size=1, policy_value_batch=None, virtual_loss=1):
         """
         初始化MCTS搜索器
         
@@ -55,13 +53,25 @@ class Mcts_plus(object):
             r: 搜索模拟次数
             is_selfplay: 是否为自我对弈模式(0=否, 1=是)
             c_puct: UCB公式中的探索常数
+            root_noise: 根节点先验概率中混入Dirichlet噪声的比例，0为不加噪声
+            batch_size: 每轮收集的叶节点数，大于1时用虚拟损失分散选择，整批一次送入网络评估
+            policy_value_batch: 批量评估函数，输入(N, 2, 8, 8)的局面，返回((N, 64)的落子概率, (N, 1)的价值)，
+                                如PolicyValueNet.policy_value；为None时逐个调用policy_value_function
+            virtual_loss: 虚拟损失的大小，按一次失败计
         """
         self.color = board.color 
-        self.board = copy.deepcopy(board)
+        self.board = board.clone()        # 工作棋盘，搜索时通过落子/撤销在树上移动
+        self.undo_stack = []              # 从根节点到当前节点的撤销记录
         self.r = r                        # 迭代次数
         self.func = policy_value_function # 策略价值函数
         self.is_selfplay = is_selfplay    # 自我对弈模式标志
         self.c_puct = c_puct              # UCB探索参数
+        self.root_noise = root_noise      # 根节点Dirichlet噪声比例
+        self.root = None                  # 最近一次搜索的根节点
+        self.batch_size = batch_size      # 批量评估的叶节点数
+        self.batch_func = policy_value_batch  # 批量策略价值函数
+        self.virtual_loss = virtual_loss  # 虚拟损失
+        self.evaluations = 0              # 神经网络评估的局面数
         
     def ucb1(self, node):
         """
@@ -80,6 +90,7 @@ class Mcts_plus(object):
     def selection(self, node):
         """
         选择阶段: 根据UCB值选择最有前途的节点
+        沿途在工作棋盘上落子，撤销记录压入undo_stack
         """
         current_node = node
         # 当节点已完全扩展，继续向下选择
@@ -95,12 +106,13 @@ class Mcts_plus(object):
                     best_child = child_node
                     
             current_node = best_child
+            self.undo_stack.append(self.board.play(best_child.candidate))
             
         return current_node
             
     def expand(self, node):
         """
-        扩展阶段: 创建一个新的子节点
+        扩展阶段: 创建一个新的子节点，工作棋盘随之走到新节点
         """
         # 找出所有未扩展的候选位置
         unexpanded_candidates = []
@@ -143,9 +155,8 @@ class Mcts_plus(object):
         new_node.parent = node
         new_node.candidate = best_candidate
         new_node.visit = 1  # 初始化访问次数为1
-        new_node.board = copy.deepcopy(node.board)  # 复制棋盘状态
-        new_node.board.reversi_pieces(best_candidate)  # 执行落子
-        new_node.next_locations = new_node.board.locations()  # 更新可行位置
+        self.undo_stack.append(self.board.play(best_candidate))  # 执行落子并交换行棋方
+        new_node.next_locations = self.board.locations()  # 更新可行位置
         
         # 更新父节点
         node.childnodes.append(best_candidate)
@@ -155,22 +166,91 @@ class Mcts_plus(object):
  
     def simulation(self, node):
         """
-        模拟阶段: 使用神经网络评估当前节点
+        模拟阶段: 使用神经网络评估当前节点（工作棋盘所在局面）
         
         注意: 不再执行随机模拟，而是直接使用神经网络评估
         """
-        # 创建棋盘副本避免修改原棋盘
-        board_copy = copy.deepcopy(node.board)
-        board_copy.locations()  # 计算可行位置
-        board_copy.pieces_index()  # 更新棋子计数
-        
         # 使用策略价值网络评估当前状态
         # 注意：神经网络视角是当前玩家，返回的score是从对手角度看的
-        node.nextlocation_prob, value = self.func(board_copy)
+        self.evaluations += 1
+        node.nextlocation_prob, value = self.func(self.board)
         
         # 将价值取反，转换为当前玩家视角
         node.score = -value
         
+    def evaluate_batch(self, boards):
+        """
+        批量评估一组局面，返回[(8x8的落子概率, 价值), ...]，价值以各局面行棋方为视角
+        """
+        self.evaluations += len(boards)
+        if self.batch_func is None:
+            return [self.func(board) for board in boards]
+        states = np.array([board.current_state() for board in boards])
+        probs, values = self.batch_func(states)
+        values = np.ravel(values)
+        return [(np.reshape(probs[i], (8, 8)), values[i]) for i in range(len(boards))]
+
+    def apply_virtual_loss(self, path, sign):
+        """
+        对路径上的节点加上（sign为1）或撤去（sign为-1）虚拟损失：
+        访问次数增加、得分按一次失败减少，使同一批的后续选择避开这条路径
+        """
+        loss = self.virtual_loss * sign
+        for node in path:
+            node.visit += loss
+            node.score -= loss
+
+    def run_batched(self, root, n):
+        """
+        批量搜索: 每轮用虚拟损失选出至多batch_size个不同的叶节点并扩展，
+        整批送入网络评估后撤去虚拟损失再逐个反向传播，共完成n次模拟
+        同一轮再次选到尚待评估的节点时提前结束这一轮
+        """
+        done = 0
+        while done < n:
+            pending = []   # [(叶节点, 根到叶的路径, 叶节点局面), ...]
+            budget = min(self.batch_size, n - done)
+            while len(pending) < budget:
+                node = self.selection(root)
+                
+                # 终局直接评估并反向传播，不进入批量
+                if self.board.is_game_over():
+                    node.score = self.board.win() if self.board.color == 'O' else -self.board.win()
+                    self.back_update(node)
+                    self.rewind()
+                    budget -= 1
+                    done += 1
+                    continue
+                
+                # 选到本轮已选中、尚未评估的节点
+                if node.nextlocation_prob is None:
+                    self.rewind()
+                    break
+                
+                if node.status == 0:
+                    expand_node = self.expand(node)
+                    if expand_node:
+                        node = expand_node
+                
+                path = []
+                current = node
+                while current is not None:
+                    path.append(current)
+                    current = current.parent
+                self.apply_virtual_loss(path, 1)
+                pending.append((node, path, self.board.clone()))
+                self.rewind()
+            
+            if not pending:
+                continue
+            results = self.evaluate_batch([board for _, _, board in pending])
+            for (node, path, _), (prob, value) in zip(pending, results):
+                self.apply_virtual_loss(path, -1)
+                node.nextlocation_prob = prob
+                node.score = -value
+                self.back_update(node)
+            done += len(pending)
+
     def back_update(self, node):
         """
         反向传播阶段: 更新节点及其祖先节点的统计信息
@@ -184,6 +264,62 @@ class Mcts_plus(object):
             current_score = -current_score  # 切换玩家视角
             current_node.parent.score += current_score
             current_node = current_node.parent
+
+    def add_root_noise(self, root, alpha=0.3):
+        """
+        在根节点合法位置的先验概率中混入Dirichlet噪声，使不同的搜索（如根并行的各进程）探索不同的走法
+        """
+        prob = np.array(root.nextlocation_prob, dtype=np.float64)
+        noise = np.random.dirichlet([alpha] * len(root.next_locations))
+        for (x, y), n in zip(root.next_locations, noise):
+            prob[x][y] = (1 - self.root_noise) * prob[x][y] + self.root_noise * n
+        root.nextlocation_prob = prob
+
+    def advance(self, board, depth=2):
+        """
+        把根节点移到与board局面相同的后代节点（通常为己方走法之后对方应着的孙节点），
+        保留其子树的访问次数和神经网络评估
+        找到时返回True，之后mcts_run在该子树上继续搜索；找不到返回False
+        """
+        node = self._find(self.root, board, depth) if self.root is not None else None
+        if node is None:
+            return False
+        node.parent = None
+        self.root = node
+        self.color = board.color
+        self.board = board.clone()
+        return True
+
+    def _find(self, node, board, depth):
+        """
+        在工作棋盘上沿子节点逐层落子，查找局面与board相同的节点
+        """
+        if self.board.black == board.black and self.board.white == board.white and self.board.color == board.color:
+            return node
+        if depth == 0:
+            return None
+        for child in node.child:
+            self.undo_stack.append(self.board.play(child.candidate))
+            found = self._find(child, board, depth - 1)
+            self.board.undo(self.undo_stack.pop())
+            if found is not None:
+                return found
+        return None
+
+    def root_children(self):
+        """
+        mcts_run之后根节点各子节点的统计：[(落子坐标, 访问次数, 累计得分), ...]，得分以根节点行棋方为视角
+        """
+        if self.root is None:
+            return []
+        return [(child.candidate, child.visit, child.score) for child in self.root.child]
+
+    def rewind(self):
+        """
+        撤销undo_stack中的所有落子，使工作棋盘回到根节点局面
+        """
+        while self.undo_stack:
+            self.board.undo(self.undo_stack.pop())
             
     def mcts_run(self):
         """
@@ -193,42 +329,54 @@ class Mcts_plus(object):
             在对战模式下: 返回最佳行动和所有行动的概率分布
             在自我对弈模式下: 返回按照Dirichlet噪声采样的行动和概率分布
         """
-        # 创建根节点
-        root = Node_plus()
-        root.color = self.color
-        root.board = self.board
-        root.board.color = root.color
-        root.next_locations = root.board.locations()
+        # 创建根节点；advance移到重用的子树时沿用原节点及其网络评估
+        root = self.root
+        if root is None:
+            root = Node_plus()
+            root.color = self.color
+            self.root = root
+        self.board.color = self.color
+        root.next_locations = self.board.locations()
         
         # 初始评估根节点
-        self.simulation(root)
+        if root.nextlocation_prob is None:
+            self.simulation(root)
         
         # 如果没有合法落子，直接返回
         if not root.next_locations:
             return None, np.zeros((8, 8))
         
-        # MCTS主循环
-        for _ in range(self.r):
-            # 选择阶段
-            node = self.selection(root)
+        if self.root_noise:
+            self.add_root_noise(root)
+        
+        # MCTS主循环，重用的子树只补足到r次访问
+        iterations = max(self.r - root.visit, 1)
+        if self.batch_size > 1:
+            self.run_batched(root, iterations)
+        else:
+            for _ in range(iterations):
+                # 选择阶段
+                node = self.selection(root)
             
-            # 如果游戏结束，直接评估
-            if node.board.is_game_over():
-                node.score = node.board.win()
-                self.back_update(node)
-                continue
+                # 如果游戏结束，直接评估（换算为走到该节点一方的视角）
+                if self.board.is_game_over():
+                    node.score = self.board.win() if self.board.color == 'O' else -self.board.win()
+                    self.back_update(node)
+                    self.rewind()
+                    continue
                 
-            # 扩展阶段
-            if node.status == 0:
-                expand_node = self.expand(node)
-                if expand_node:
-                    node = expand_node
+                # 扩展阶段
+                if node.status == 0:
+                    expand_node = self.expand(node)
+                    if expand_node:
+                        node = expand_node
                     
-            # 模拟阶段
-            self.simulation(node)
+                # 模拟阶段
+                self.simulation(node)
             
-            # 反向传播
-            self.back_update(node)
+                # 反向传播
+                self.back_update(node)
+                self.rewind()
             
         # 选择访问次数最多的动作
         best_action = None
@@ -248,4 +396,24 @@ class Mcts_plus(object):
         if np.sum(action_probs) > 0:
             action_probs = action_probs / np.sum(action_probs)
             
-        return best_action, action_probs
\ No newline at end of file
+        return best_action, action_probs
+
+
+def benchmark(policy_value_fn, policy_value_batch, batch_sizes=(1, 8, 16, 32), r=400):
+    """
+    比较不同batch_size下从初始局面搜索的速度，输出每秒网络评估的局面数
+    """
+    import time
+    from board import Board
+    for batch_size in batch_sizes:
+        search = Mcts_plus(Board(), policy_value_fn, r, batch_size=batch_size, policy_value_batch=policy_value_batch)
+        start = time.time()
+        search.mcts_run()
+        elapsed = time.time() - start
+        print(f"batch_size: {batch_size:3d}  局面/秒: {search.evaluations / elapsed:7.0f}  用时: {elapsed:.2f}秒")
+
+
+if __name__ == '__main__':
+    from policy_value_net import PolicyValueNet
+    net = PolicyValueNet()
+    benchmark(net.policy_value_fn, net.policy_value)
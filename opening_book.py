@@ -0,0 +1,170 @@
+import struct
+import time
+import numpy as np
+from board import Board
+from symmetry import canonical_hash, to_canonical_square, from_canonical_square
+
+'''
+开局库
+离线用chess.AI深度搜索或Mcts_plus访问次数为开局阶段的局面选出走法，写入按键值排序的二进制文件；
+对弈时以内存映射方式打开文件，用二分查找取出走法
+局面以对称规范代表的Zobrist键值为索引，走法以规范代表中的格子编号保存，因此旋转、镜像后的局面共用同一条目
+
+文件格式（小端序）：
+    文件头16字节：魔数b'RVBOOK01' + 条目数n(8字节)
+    键值 n * 8字节（升序）
+    得分 n * 2字节（选出走法时的估值）
+    走法 n * 1字节（规范代表中的格子编号）
+'''
+
+MAGIC = b'RVBOOK01'
+_HEADER = struct.Struct('<8sQ')
+
+
+def write_book(path, entries):
+    '''
+    把{键值: (规范格子编号, 得分)}写入开局库文件
+    '''
+    keys = np.array(sorted(entries), dtype='<u8')
+    scores = np.array([entries[int(k)][1] for k in keys], dtype='<i2')
+    moves = np.array([entries[int(k)][0] for k in keys], dtype=np.uint8)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(keys)))
+        f.write(keys.tobytes())
+        f.write(scores.tobytes())
+        f.write(moves.tobytes())
+
+
+class OpeningBook(object):
+    '''
+    内存映射的开局库
+    '''
+    def __init__(self, path):
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, n = _HEADER.unpack(bytes(data[:_HEADER.size]))
+        if magic != MAGIC:
+            raise ValueError(f'{path} 不是开局库文件')
+        offset = _HEADER.size
+        self.keys = data[offset:offset + 8 * n].view('<u8')
+        offset += 8 * n
+        self.scores = data[offset:offset + 2 * n].view('<i2')
+        offset += 2 * n
+        self.moves = data[offset:offset + n]
+        self.size = n
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, black, white, color):
+        '''
+        查询局面，命中时返回(格子编号, 得分)，否则返回None
+        '''
+        key, s = canonical_hash(black, white, color)
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i >= self.size or int(self.keys[i]) != key:
+            return None
+        return from_canonical_square(int(self.moves[i]), s), int(self.scores[i])
+
+    def lookup(self, board):
+        '''
+        查询Board当前局面的开局库走法，返回坐标(i, j)；未命中或走法不合法（键值冲突）时返回None
+        '''
+        entry = self.probe(board.black, board.white, board.color)
+        if entry is None or not (board.legal_moves() >> entry[0]) & 1:
+            return None
+        return divmod(entry[0], 8)
+
+
+def chess_chooser(depth=6, time_limit=None):
+    '''
+    用chess.AI搜索选择走法，返回choose(board) -> (格子编号, 得分)
+    '''
+    from chess import AI, INFINITY
+    ai = AI(8, -1, time_limit or 0)
+
+    def choose(board):
+        ai.color = -1 if board.color == 'X' else 1
+        masks = (board.black, board.white)
+        if time_limit:
+            ai.best_score = None
+            move = ai.go(masks)
+            score = ai.best_score or 0
+        else:
+            ai.new_search()
+            score = ai._pvs(ai.color, masks, 1, -INFINITY, INFINITY, depth + 1, board.key)
+            move = ai.root_move
+        return move[0] * 8 + move[1], int(np.clip(score, -32768, 32767))
+    return choose
+
+
+def mcts_chooser(policy_value_function, n_playout=1000):
+    '''
+    用Mcts_plus的访问次数选择走法，得分为该走法访问次数的千分比
+    '''
+    from mcts_plus import Mcts_plus
+
+    def choose(board):
+        move, probs = Mcts_plus(board, policy_value_function, n_playout).mcts_run()
+        return move[0] * 8 + move[1], int(probs[move] * 1000)
+    return choose
+
+
+def build_book(choose, max_plies=8, verbose=True):
+    '''
+    从初始局面出发生成开局库条目
+    分别以黑方和白方为库方：库方按choose选出的走法走，另一方展开全部合法走法，直到max_plies步
+    返回{键值: (规范格子编号, 得分)}
+    '''
+    entries = {}
+    start = time.time()
+    for book_color in ('X', 'O'):
+        frontier = [Board()]
+        for ply in range(max_plies):
+            children = []
+            seen = set()
+            for board in frontier:
+                locations = board.locations()
+                if not locations:
+                    continue
+                if board.color == book_color:
+                    key, s = canonical_hash(board.black, board.white, board.color)
+                    if key not in entries:
+                        sq, score = choose(board)
+                        entries[key] = (to_canonical_square(sq, s), score)
+                    moves = [divmod(from_canonical_square(entries[key][0], s), 8)]
+                else:
+                    moves = locations
+                for move in moves:
+                    child = board.clone()
+                    child.play(move)
+                    child_key = canonical_hash(child.black, child.white, child.color)[0]
+                    if child_key not in seen:
+                        seen.add(child_key)
+                        children.append(child)
+            frontier = children
+            if verbose:
+                print(f"库方{book_color} 第{ply + 1}步  条目数: {len(entries)}  用时: {time.time() - start:.1f}秒")
+    return entries
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='生成开局库')
+    parser.add_argument('--out', default='opening.book', help='输出文件')
+    parser.add_argument('--plies', type=int, default=8, help='开局库覆盖的步数')
+    parser.add_argument('--source', choices=['chess', 'mcts'], default='chess', help='选择走法的引擎')
+    parser.add_argument('--depth', type=int, default=6, help='chess.AI的搜索深度')
+    parser.add_argument('--time', type=float, default=None, help='chess.AI每个局面的限时（秒），设置后代替固定深度')
+    parser.add_argument('--model', default='./best_policy.model', help='Mcts_plus使用的模型文件')
+    parser.add_argument('--playout', type=int, default=1000, help='Mcts_plus的模拟次数')
+    args = parser.parse_args()
+
+    if args.source == 'chess':
+        chooser = chess_chooser(args.depth, args.time)
+    else:
+        from policy_value_net import PolicyValueNet
+        net = PolicyValueNet(model_file=args.model)
+        chooser = mcts_chooser(net.policy_value_fn, args.playout)
+    book = build_book(chooser, args.plies)
+    write_book(args.out, book)
+    print(f"已写入 {args.out}，共 {len(book)} 个局面")
@@ -0,0 +1,162 @@
+import multiprocessing as mp
+import random
+import time
+import numpy as np
+from board import Board
+from mcts import Mcts
+from mcts_plus import Mcts_plus
+
+'''
+根并行蒙特卡洛树搜索
+W个工作进程从同一根节点各自独立建树（各用不同的随机种子），搜索结束后把根节点各子节点的访问次数与得分相加，
+据此选择走法并生成action_probs
+纯MCTS的各进程靠随机模拟自然产生差异；Mcts_plus的神经网络评估是确定的，
+除第0个进程外都在根节点先验中混入Dirichlet噪声
+策略价值函数在创建进程池时传给工作进程（fork时的快照），网络权重更新后需要close()重新创建
+'''
+
+ROOT_NOISE = 0.25        # Mcts_plus工作进程的根节点噪声比例
+
+_worker_fn = None        # 工作进程中的策略价值函数，纯MCTS时为None
+
+
+def _init_worker(policy_value_function):
+    '''
+    工作进程初始化
+    '''
+    global _worker_fn
+    _worker_fn = policy_value_function
+
+
+def _search_root(task):
+    '''
+    工作进程：从给定局面独立搜索一棵树，返回根节点各子节点的统计
+    '''
+    black, white, color, r, seed, rollouts_per_leaf, root_noise = task
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    board = Board.from_masks(black, white, color)
+    if _worker_fn is None:
+        search = Mcts(board, r, rollouts_per_leaf=rollouts_per_leaf)
+    else:
+        search = Mcts_plus(board, _worker_fn, r, root_noise=root_noise)
+    search.mcts_run()
+    return search.root_children()
+
+
+def merge_root_children(results):
+    '''
+    合并多棵树根节点的统计，返回{落子坐标: [访问次数, 累计得分]}
+    '''
+    merged = {}
+    for children in results:
+        for move, visit, score in children:
+            stats = merged.setdefault(move, [0, 0.0])
+            stats[0] += visit
+            stats[1] += score
+    return merged
+
+
+class RootParallelMcts(object):
+    '''
+    根并行搜索器，在一局棋的各步之间复用进程池
+    '''
+    def __init__(self, workers=2, policy_value_function=None, rollouts_per_leaf=1):
+        '''
+        参数:
+            workers: 工作进程数（即独立搜索树的数量）
+            policy_value_function: 策略价值函数，None时各进程使用纯MCTS
+            rollouts_per_leaf: 纯MCTS每个叶节点的随机模拟局数
+        '''
+        self.workers = workers
+        self.func = policy_value_function
+        self.rollouts_per_leaf = rollouts_per_leaf
+        self.pool = None
+
+    def _get_pool(self):
+        '''
+        第一次使用时创建进程池，之后各步复用
+        '''
+        if self.pool is None:
+            self.pool = mp.Pool(self.workers, initializer=_init_worker, initargs=(self.func,))
+        return self.pool
+
+    def close(self):
+        '''
+        关闭进程池
+        '''
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def search(self, board, r):
+        '''
+        每个工作进程各搜索r次，返回合并后的{落子坐标: [访问次数, 累计得分]}
+        '''
+        base = random.getrandbits(32)
+        tasks = [(board.black, board.white, board.color, r, base + w, self.rollouts_per_leaf,
+                  ROOT_NOISE if w else 0) for w in range(self.workers)]
+        return merge_root_children(self._get_pool().map(_search_root, tasks))
+
+    def mcts_run(self, board, r):
+        '''
+        返回(访问次数最多的走法, 8x8的访问次数分布)，与Mcts_plus.mcts_run的返回值相同
+        无合法落子时返回(None, 全零分布)
+        '''
+        action_probs = np.zeros((8, 8))
+        if not board.locations():
+            return None, action_probs
+        merged = self.search(board, r)
+        best_action = max(merged, key=lambda move: merged[move][0])
+        for (x, y), (visit, _) in merged.items():
+            action_probs[x][y] = visit
+        return best_action, action_probs / np.sum(action_probs)
+
+
+def _play(black, white, n_games, seed):
+    '''
+    两个AIPlayer对局n_games局（交换先后手），返回black一方的得分率
+    '''
+    from game import Game
+    random.seed(seed)
+    score = 0.0
+    for k in range(n_games):
+        first, second = (black, white) if k % 2 == 0 else (white, black)
+        game = Game(first, second)
+        game.selfplay_run()
+        winner = game.board.win() if k % 2 == 0 else -game.board.win()
+        score += (winner + 1) / 2
+    return score / n_games
+
+
+def benchmark(worker_counts=None, r=200, games=4, seed=0):
+    '''
+    比较不同工作进程数下纯MCTS根并行的每秒模拟次数，
+    并让W个进程的AIPlayer与单进程AIPlayer（每棵树模拟次数相同）对局，统计得分率
+    '''
+    from player import AIPlayer
+    worker_counts = worker_counts or sorted({1, 2, 4, mp.cpu_count()})
+    for workers in worker_counts:
+        searcher = RootParallelMcts(workers)
+        board = Board()
+        random.seed(seed)
+        if workers > 1:
+            searcher._get_pool()
+        start = time.time()
+        if workers > 1:
+            searcher.mcts_run(board, r)
+        else:
+            Mcts(board, r).mcts_run()
+        elapsed = time.time() - start
+        line = f"工作进程数: {workers}  模拟次数/秒: {workers * r / elapsed:.0f}"
+        if workers > 1:
+            player = AIPlayer(r, workers=workers)
+            line += f"  对单进程得分率: {_play(player, AIPlayer(r), games, seed) * 100:.1f}%"
+            player.close()
+        searcher.close()
+        print(line)
+
+
+if __name__ == '__main__':
+    benchmark()
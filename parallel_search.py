@@ -0,0 +1,259 @@
+import multiprocessing as mp
+import time
+import bitboard
+from chess import AI, SearchTimeout, INFINITY, COLOR_BLACK
+from transposition import EXACT
+
+'''
+多进程并行Alpha-Beta搜索（根节点分割）
+主进程先用完整窗口搜索排序后的第一个走法得到alpha，
+其余走法分发给工作进程，用共享的alpha做零窗口验证，超过alpha的走法再用完整窗口重新搜索并更新共享alpha
+每个工作进程持有自己的AI实例和转置表，在一局棋的各步之间保留
+analyse_batch用同样的工作进程批量做多主变例分析，每个局面交给一个进程
+'''
+
+_worker_ai = None        # 工作进程中的AI实例
+_shared_alpha = None     # 所有进程共享的根节点alpha
+_search_id = None        # 工作进程当前所处的搜索编号，变化时开始新一轮搜索
+
+
+def _init_worker(shared_alpha, tt_size, weights, symmetric_tt, probcut):
+    '''
+    工作进程初始化
+    '''
+    global _worker_ai, _shared_alpha
+    _worker_ai = AI(8, COLOR_BLACK, 0, tt_size=tt_size, weights=weights, symmetric_tt=symmetric_tt, probcut=probcut)
+    _shared_alpha = shared_alpha
+
+
+def _search_move(task):
+    '''
+    工作进程：搜索根节点的一个走法
+    返回(走法, 估值, 节点数, 是否完成)，估值为None表示落子后对方无子可下（与串行搜索一样跳过）
+    '''
+    global _search_id
+    search_id, color, board, key, move, depth, deadline = task
+    ai = _worker_ai
+    if search_id != _search_id:
+        _search_id = search_id
+        ai.new_search()
+    ai.color = color
+    ai.deadline = deadline
+    ai.nodes = 0
+    ai._follow_pv = False
+    newboard, newkey = ai._make_move(board, key, color, move)
+    try:
+        alpha = _shared_alpha.value
+        n = ai._pvs(-color, newboard, 2, -alpha - 1, -alpha, depth + 1, newkey)
+        if n is not None and -n > alpha:
+            # 零窗口验证失败（可能更好），用完整窗口重新搜索
+            n = ai._pvs(-color, newboard, 2, -INFINITY, -alpha, depth + 1, newkey)
+        if n is None:
+            return move, None, ai.nodes, True
+        value = -n
+        with _shared_alpha.get_lock():
+            if value > _shared_alpha.value:
+                _shared_alpha.value = value
+        return move, value, ai.nodes, True
+    except SearchTimeout:
+        return move, None, ai.nodes, False
+    finally:
+        ai.deadline = None
+
+
+def _analyse_position(task):
+    '''
+    工作进程：对一个局面做多主变例分析
+    '''
+    board, color, k, depth, time_limit = task
+    ai = _worker_ai
+    ai.color = color
+    return ai.analyse(board, k, depth, time_limit)
+
+
+def analyse_batch(positions, k=3, depth=None, time_limit=None, workers=None, tt_size=16, weights=None):
+    '''
+    用进程池批量分析多个局面
+    参数:
+        positions: [((黑棋掩码, 白棋掩码), 行棋方), ...]，行棋方黑棋为-1，白棋为1
+        k, depth, time_limit: 同AI.analyse
+        workers: 进程数，None时为CPU核数
+    返回与positions顺序一致的analyse结果列表
+    '''
+    tasks = [(board, color, k, depth, time_limit) for board, color in positions]
+    with mp.Pool(workers or mp.cpu_count(), initializer=_init_worker,
+                 initargs=(None, tt_size, weights, False, False)) as pool:
+        return pool.map(_analyse_position, tasks)
+
+
+class ParallelAI(AI):
+    '''
+    根节点分割的多进程搜索，接口与AI相同
+    '''
+    def __init__(self, chessboard_size, color, time_out, workers=2, tt_size=16, weights=None, symmetric_tt=False,
+                 probcut=False):
+        '''
+        参数:
+            workers: 工作进程数
+        '''
+        super().__init__(chessboard_size, color, time_out, tt_size=tt_size, weights=weights,
+                         symmetric_tt=symmetric_tt, probcut=probcut)
+        self.workers = workers
+        self.tt_size = tt_size
+        self.weights = weights
+        self.shared_alpha = mp.Value('i', 0)
+        self.pool = None
+        self.search_id = 0
+
+    def _get_pool(self):
+        '''
+        第一次使用时创建进程池，之后各步复用
+        '''
+        if self.pool is None:
+            self.pool = mp.Pool(self.workers, initializer=_init_worker,
+                                initargs=(self.shared_alpha, self.tt_size, self.weights, self.symmetric_tt, self.probcut))
+        return self.pool
+
+    def close(self):
+        '''
+        关闭进程池
+        '''
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def go(self, chessboard, max_depth=60):
+        """
+        限时迭代加深搜索，每一轮都在根节点分割给工作进程
+        """
+        start = time.time()
+        return self._iterate(chessboard, max_depth, start + self.time_out, start)
+
+    def search(self, color, board, deep, alpha, beta, t, key=None):
+        """
+        固定深度搜索接口：根节点（deep为1）时并行迭代加深到t-1层并返回最佳走法，其余情况同AI.search
+        """
+        if deep != 1:
+            return super().search(color, board, deep, alpha, beta, t, key)
+        self.color = color
+        return self._iterate(board, t - 1, None, time.time())
+
+    def _iterate(self, chessboard, max_depth, deadline, start):
+        '''
+        迭代加深驱动，返回最后一轮完整搜索的最佳走法
+        '''
+        self.pv = []
+        self.completed_depth = 0
+        self.candidate_list = self.find_choice(chessboard, self.color)
+        if not self.candidate_list:
+            return None
+        best_move = self.candidate_list[0]
+        if len(self.candidate_list) == 1:
+            return best_move
+
+        self.new_search()
+        self.search_id += 1
+        key = self._get_board_hash(chessboard, self.color)
+        black, white = chessboard
+        max_depth = min(max_depth, 64 - bitboard.popcount(black | white))
+
+        try:
+            for depth in range(1, max_depth + 1):
+                result = self._split_root(chessboard, key, depth, deadline)
+                if result is None:
+                    break
+                best_move, self.best_score = result
+                self.root_move = best_move
+                self.candidate_list.append(best_move)
+                self.completed_depth = depth
+                self.pv = [best_move]
+                # 已用去一半以上的时间时，下一轮几乎不可能完成
+                if deadline is not None and time.time() - start > self.time_out / 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best_move
+
+    def _split_root(self, board, key, depth, deadline):
+        '''
+        搜索一轮根节点，返回(最佳走法, 估值)；超时未完成返回None
+        '''
+        color = self.color
+        key, sym, entry = self._probe(board, color, key)
+        choice = self._order_moves(self.find_choice(board, color), 1, entry[3] if entry else -1)
+
+        # 主进程搜索第一个有估值的走法，作为共享alpha的初值
+        self.deadline = deadline
+        self._follow_pv = False
+        best, best_move = None, choice[0]
+        rest = []
+        for i, move in enumerate(choice):
+            newboard, newkey = self._make_move(board, key, color, move)
+            n = self._pvs(-color, newboard, 2, -INFINITY, INFINITY, depth + 1, newkey)
+            if n is not None:
+                best, best_move = -n, move
+                rest = choice[i + 1:]
+                break
+        if best is None:
+            return best_move, -99999
+        self.shared_alpha.value = best
+
+        tasks = [(self.search_id, color, board, key, move, depth, deadline) for move in rest]
+        for move, value, nodes, completed in self._get_pool().imap_unordered(_search_move, tasks):
+            self.nodes += nodes
+            if not completed:
+                return None
+            if value is not None and value > best:
+                best, best_move = value, move
+
+        self._store(key, depth, best, EXACT, best_move, sym)
+        return best_move, best
+
+
+def benchmark(worker_counts=None, depth=5, positions=8, seed=1):
+    '''
+    比较不同工作进程数下固定深度搜索的耗时，输出相对串行搜索的加速比
+    '''
+    import random
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < positions:
+        black, white = 0x0000000810000000, 0x0000001008000000
+        color = COLOR_BLACK
+        for _ in range(rng.randint(8, 20)):
+            own, opp = (black, white) if color == COLOR_BLACK else (white, black)
+            moves = list(bitboard.squares(bitboard.legal_moves(own, opp)))
+            if not moves:
+                break
+            sq = rng.choice(moves)
+            flipped = bitboard.flips(own, opp, sq)
+            own, opp = own | flipped | (1 << sq), opp ^ flipped
+            black, white = (own, opp) if color == COLOR_BLACK else (opp, own)
+            color = -color
+        else:
+            boards.append(((black, white), color))
+
+    worker_counts = worker_counts or sorted({1, 2, 4, mp.cpu_count()})
+    base = None
+    for workers in worker_counts:
+        if workers == 1:
+            ai = AI(8, COLOR_BLACK, 0)
+        else:
+            ai = ParallelAI(8, COLOR_BLACK, 0, workers=workers)
+            ai._get_pool()
+        start = time.time()
+        for board, color in boards:
+            ai.new_search()
+            ai.search(color, board, 1, -INFINITY, INFINITY, depth + 1)
+        elapsed = time.time() - start
+        if workers > 1:
+            ai.close()
+        base = base or elapsed
+        print(f"工作进程数: {workers}  耗时: {elapsed:.2f}秒  加速比: {base / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    benchmark()
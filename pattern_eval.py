@@ -0,0 +1,195 @@
+import numpy as np
+import bitboard
+from bitboard import A_FILE, COL_MAGIC, SPREAD, popcount, legal_moves
+from symmetry import mirror, flip_vertical
+
+'''
+基于模式查表的局面评估
+把边、角部3x3区域、两条主对角线上的棋子排布编码为三进制索引（空=0，己方=1，对方=2），
+评估时每个模式只需一次查表；边上的稳定子数量在加载权重时并入边的表中
+权重可以保存为.npz文件并重新加载
+'''
+
+EDGE_SIZE = 3 ** 8        # 8格直线模式的索引数
+CORNER_SIZE = 3 ** 9      # 3x3角部模式的索引数
+
+# 二进制位模式到三进制索引的转换表：第k位为1时贡献3**k
+TERNARY8 = [sum(3 ** k for k in range(8) if (b >> k) & 1) for b in range(256)]
+TERNARY8_2 = [2 * t for t in TERNARY8]
+TERNARY9 = [sum(3 ** k for k in range(9) if (b >> k) & 1) for b in range(512)]
+TERNARY9_2 = [2 * t for t in TERNARY9]
+
+MAIN_DIAG = bitboard.DIAG[0]    # (0,0)到(7,7)
+ANTI_DIAG = bitboard.ANTI[7]    # (0,7)到(7,0)
+
+# 原有位置权重中边上8格的分值，两个角各算一半（每个角属于两条边）
+EDGE_WEIGHTS = [1000, -60, 300, 200, 200, 300, -60, 1000]
+C_SQUARE_OWNED = 400      # 角已被同色占据时，相邻C位的分值
+
+DEFAULT_STABILITY = 40    # 每个稳定子的分值
+DEFAULT_MOBILITY = 220    # 行动力每多一步的分值
+ENDGAME_DISC = 500        # 剩余空格不足4个时每个棋子的分值
+
+
+def _digits(index, n):
+    """三进制索引展开为n个格子的状态列表（0空，1己方，2对方）"""
+    d = []
+    for _ in range(n):
+        index, r = divmod(index, 3)
+        d.append(r)
+    return d
+
+
+def _sign(state):
+    return 1 if state == 1 else -1 if state == 2 else 0
+
+
+def edge_stability(d):
+    '''
+    一条边上的稳定子数量差（己方 - 对方）
+    边被填满时全部稳定，否则从两端的角起连续的同色棋子稳定
+    '''
+    if 0 not in d:
+        return sum(_sign(s) for s in d)
+    stable = [False] * 8
+    for order in (range(8), range(7, -1, -1)):
+        first = None
+        for k in order:
+            if d[k] == 0 or (first is not None and d[k] != first):
+                break
+            first = d[k]
+            stable[k] = True
+    return sum(_sign(d[k]) for k in range(8) if stable[k])
+
+
+def default_weights():
+    '''
+    由原有位置权重表生成的默认模式权重
+    '''
+    edge = np.zeros(EDGE_SIZE, dtype=np.int32)
+    for index in range(EDGE_SIZE):
+        d = _digits(index, 8)
+        value = 0
+        for k in range(8):
+            w = EDGE_WEIGHTS[k]
+            if k == 1 and d[0] == d[1]:
+                w = C_SQUARE_OWNED
+            elif k == 6 and d[7] == d[6]:
+                w = C_SQUARE_OWNED
+            value += _sign(d[k]) * w
+        edge[index] = value
+
+    # 角部3x3：格子按从角开始的行优先顺序编号，边上的格子已计入边的模式，这里只计内侧四格
+    corner = np.zeros(CORNER_SIZE, dtype=np.int32)
+    for index in range(CORNER_SIZE):
+        d = _digits(index, 9)
+        x_weight = -400
+        if d[4] != 0 and d[0] == d[1] == d[3] == d[4]:
+            x_weight = 100   # 角和两侧C位都是同色时，X位不再危险
+        corner[index] = _sign(d[4]) * x_weight + _sign(d[5]) + _sign(d[7]) + _sign(d[8]) * 10
+
+    # 对角线：只计中心两格，其余格子已计入角部模式
+    diagonal = np.zeros(EDGE_SIZE, dtype=np.int32)
+    for index in range(EDGE_SIZE):
+        d = _digits(index, 8)
+        diagonal[index] = (_sign(d[3]) + _sign(d[4])) * 3
+
+    return {
+        'edge': edge,
+        'corner': corner,
+        'diagonal': diagonal,
+        'stability': DEFAULT_STABILITY,
+        'mobility': DEFAULT_MOBILITY,
+    }
+
+
+# 每种边模式上的稳定子数量差
+EDGE_STABLE = [edge_stability(_digits(index, 8)) for index in range(EDGE_SIZE)]
+
+
+def _corner_bits(x):
+    """左上角3x3区域的9位模式，按行优先顺序"""
+    return (x & 7) | ((x >> 5) & 0x38) | ((x >> 10) & 0x1C0)
+
+
+class PatternEvaluator(object):
+    '''
+    模式查表评估函数
+    '''
+    def __init__(self, path=None):
+        '''
+        参数:
+            path: 权重文件(.npz)路径，为None时使用默认权重
+        '''
+        self.weights = None
+        if path is None:
+            self.set_weights(default_weights())
+        else:
+            self.load(path)
+
+    def set_weights(self, weights):
+        '''
+        设置权重并生成查找表：稳定子的分值并入边的表中，表转为列表以加快逐项查找
+        '''
+        edge = np.asarray(weights['edge'], dtype=np.int64)
+        corner = np.asarray(weights['corner'], dtype=np.int64)
+        diagonal = np.asarray(weights['diagonal'], dtype=np.int64)
+        if edge.shape != (EDGE_SIZE,) or diagonal.shape != (EDGE_SIZE,) or corner.shape != (CORNER_SIZE,):
+            raise ValueError('模式权重的形状不正确')
+        self.weights = weights
+        self.stability = int(weights['stability'])
+        self.mobility = int(weights['mobility'])
+        self.edge_table = (edge + self.stability * np.asarray(EDGE_STABLE)).tolist()
+        self.corner_table = corner.tolist()
+        self.diagonal_table = diagonal.tolist()
+
+    def load(self, path):
+        '''
+        从.npz文件加载权重
+        '''
+        with np.load(path) as data:
+            self.set_weights({name: data[name] for name in ('edge', 'corner', 'diagonal', 'stability', 'mobility')})
+
+    def save(self, path):
+        '''
+        把当前权重保存为.npz文件
+        '''
+        np.savez(path, **self.weights)
+
+    def evaluate(self, p, o):
+        '''
+        以p一方为视角的局面估值：模式查表 + 行动力
+        '''
+        mobility = popcount(legal_moves(p, o)) - popcount(legal_moves(o, p))
+        if popcount(p | o) > 60:
+            return ENDGAME_DISC * (popcount(p) - popcount(o)) + mobility * self.mobility
+
+        t, t2 = TERNARY8, TERNARY8_2
+        edge = self.edge_table
+        diagonal = self.diagonal_table
+
+        # 上下两条边
+        value = edge[t[p & 0xFF] + t2[o & 0xFF]] + edge[t[p >> 56] + t2[o >> 56]]
+        # 左右两条边
+        value += edge[t[((p & A_FILE) * COL_MAGIC >> 56) & 0xFF] + t2[((o & A_FILE) * COL_MAGIC >> 56) & 0xFF]]
+        value += edge[t[(((p >> 7) & A_FILE) * COL_MAGIC >> 56) & 0xFF]
+                      + t2[(((o >> 7) & A_FILE) * COL_MAGIC >> 56) & 0xFF]]
+        # 两条主对角线
+        value += diagonal[t[((p & MAIN_DIAG) * SPREAD >> 56) & 0xFF] + t2[((o & MAIN_DIAG) * SPREAD >> 56) & 0xFF]]
+        value += diagonal[t[((p & ANTI_DIAG) * SPREAD >> 56) & 0xFF] + t2[((o & ANTI_DIAG) * SPREAD >> 56) & 0xFF]]
+
+        # 四个角：翻转棋盘使每个角都位于左上角
+        corner = self.corner_table
+        t, t2 = TERNARY9, TERNARY9_2
+        pm, om = mirror(p), mirror(o)
+        for x, y in ((p, o), (pm, om), (flip_vertical(p), flip_vertical(o)),
+                     (flip_vertical(pm), flip_vertical(om))):
+            value += corner[t[_corner_bits(x)] + t2[_corner_bits(y)]]
+
+        return value + mobility * self.mobility
+
+
+if __name__ == '__main__':
+    import sys
+    # 导出默认权重，作为离线调整的起点：python pattern_eval.py weights.npz
+    PatternEvaluator().save(sys.argv[1] if len(sys.argv) > 1 else 'pattern_weights.npz')
@@ -2,7 +2,11 @@ from mcts_plus import Mcts_plus
 import random
 import numpy as np
 from chess import AI as chessAI # For ChessAIPlayer
+from parallel_search import ParallelAI # 多进程根节点分割搜索
 from mcts import Mcts  # For pure MCTS AIPlayer
+from parallel_mcts import RootParallelMcts # 多进程根并行MCTS
+from endgame import EndgameSolver  # 残局精确求解
+from opening_book import OpeningBook  # 开局库
 
 class HumanPlayer():
     '''
@@ -34,9 +38,18 @@ class AIPlayerplus():    # 利用结合神经网络的蒙特卡洛树搜索的AI
     '''
     神经网络 AI 玩家
     '''
-    def __init__(self, policy_value_function, mcts_n=400):
+    def __init__(self, policy_value_function, mcts_n=400, endgame_empties=12, book=None, workers=1, reuse_tree=True,
+                 batch_size=1, policy_value_batch=None):
         self.mcts_n = mcts_n
         self.policy_value_function = policy_value_function
+        self.workers = workers # 根并行的进程数，大于1时每个进程各搜索mcts_n次后合并根节点统计
+        self.parallel = None
+        self.reuse_tree = reuse_tree # 单进程搜索时是否在各步之间保留搜索树
+        self.search = None # 上一步的Mcts_plus搜索器
+        self.batch_size = batch_size # 每轮批量评估的叶节点数（虚拟损失），大于1时需配合policy_value_batch
+        self.policy_value_batch = policy_value_batch # 批量策略价值函数，如PolicyValueNet.policy_value
+        self.endgame = EndgameSolver(endgame_empties) # 剩余空格不超过endgame_empties时精确求解
+        self.book = OpeningBook(book) if book else None # 开局库文件路径，None时不使用开局库
         
     def move(self, board):
         '''
@@ -45,7 +58,18 @@ class AIPlayerplus():    # 利用结合神经网络的蒙特卡洛树搜索的AI
         if hasattr(board, 'pieces_index') and callable(getattr(board, 'pieces_index')):
             board.pieces_index()
         
-        mcts_result = Mcts_plus(board, self.policy_value_function, self.mcts_n).mcts_run()
+        # 开局库命中时直接走库内走法
+        if self.book is not None:
+            action = self.book.lookup(board)
+            if action is not None:
+                return action
+        
+        # 残局直接求解
+        action = self.endgame.board_move(board)
+        if action is not None:
+            return action
+        
+        mcts_result = self._mcts_run(board, 0)
         
         if isinstance(mcts_result, tuple) and len(mcts_result) > 0:
             action = mcts_result[0]
@@ -73,17 +97,56 @@ class AIPlayerplus():    # 利用结合神经网络的蒙特卡洛树搜索的AI
         if hasattr(board, 'pieces_index') and callable(getattr(board, 'pieces_index')):
             board.pieces_index()
 
+        # 残局直接求解，以最佳走法的one-hot分布作为训练目标
+        action = self.endgame.board_move(board)
+        if action is not None:
+            action_probs = np.zeros((8, 8))
+            action_probs[action] = 1.0
+            return action, action_probs
+
         # Assuming Mcts_plus with is_selfplay=1 or similar argument
-        action_data = Mcts_plus(board, self.policy_value_function, self.mcts_n, is_selfplay=1).mcts_run() 
+        action_data = self._mcts_run(board, 1)
             
         return action_data
 
+    def _mcts_run(self, board, is_selfplay):
+        '''
+        单进程时直接用Mcts_plus搜索，多进程时根并行搜索，返回(动作, 动作概率)
+        '''
+        if self.workers > 1:
+            if self.parallel is None:
+                self.parallel = RootParallelMcts(self.workers, self.policy_value_function)
+            return self.parallel.mcts_run(board, self.mcts_n)
+        # 上一步的树中找到当前局面（己方走法之后对方应着的孙节点）时在其子树上继续搜索
+        if self.reuse_tree and self.search is not None and self.search.advance(board):
+            self.search.is_selfplay = is_selfplay
+        else:
+            self.search = Mcts_plus(board, self.policy_value_function, self.mcts_n, is_selfplay=is_selfplay,
+                                    batch_size=self.batch_size, policy_value_batch=self.policy_value_batch)
+        return self.search.mcts_run()
+
+    def close(self):
+        '''
+        关闭根并行的进程池（网络权重更新后也需调用，下次搜索时以新权重重新创建）
+        '''
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
 class ChessAIPlayer(): # Traditional Algorithm AI
     '''
     传统算法 AI 玩家 (使用 chess.py)
     '''
-    def __init__(self, search_depth=4):
+    def __init__(self, search_depth=4, time_limit=None, endgame_empties=12, weights=None, workers=1, book=None, symmetric_tt=False,
+                 probcut=False):
         self.search_depth = search_depth
+        self.workers = workers # 搜索进程数，大于1时在根节点分割给多个工作进程
+        self.symmetric_tt = symmetric_tt # 转置表是否按对称规范代表共用条目
+        self.probcut = probcut # 是否启用Multi-ProbCut选择性搜索
+        self.weights = weights # 模式评估的权重文件路径，None时使用默认权重
+        self.time_limit = time_limit # 每步思考时间（秒），设置后使用限时迭代加深代替固定深度
+        self.endgame = EndgameSolver(endgame_empties) # 剩余空格不超过endgame_empties时精确求解
+        self.book = OpeningBook(book) if book else None # 开局库文件路径，None时不使用开局库
         self.ai_engine = None
         self.board_size = 8 # Assuming a standard 8x8 board; adjust if necessary
         
@@ -99,25 +162,38 @@ class ChessAIPlayer(): # Traditional Algorithm AI
         if not valid_locations: # 无可用走法
             return board.pass_action() if hasattr(board, 'pass_action') else None
         
-        # 创建适合chess.py AI的棋盘表示
-        chess_board_representation = [[0 for _ in range(self.board_size)] for _ in range(self.board_size)]
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                if hasattr(board, 'board'):
-                    if board.board[r][c] == 'X': 
-                        chess_board_representation[r][c] = -1  # 黑棋为-1
-                    elif board.board[r][c] == 'O': 
-                        chess_board_representation[r][c] = 1   # 白棋为1
+        # 开局库命中时直接走库内走法
+        if self.book is not None:
+            action = self.book.lookup(board)
+            if action is not None:
+                return action
+        
+        # 残局直接求解
+        action = self.endgame.board_move(board)
+        if action is not None:
+            return action
+        
+        # 创建适合chess.py AI的棋盘表示：(黑棋掩码, 白棋掩码)，黑棋为-1，白棋为1
+        chess_board_representation = (board.black, board.white)
         
         # 设置AI引擎的颜色
         player_color_for_engine = -1 if current_player_symbol == 'X' else 1
         
         # 初始化或更新AI引擎
         if self.ai_engine is None:
-            self.ai_engine = chessAI(self.board_size, player_color_for_engine, 5) 
+            if self.workers > 1:
+                self.ai_engine = ParallelAI(self.board_size, player_color_for_engine, self.time_limit or 5,
+                                            workers=self.workers, weights=self.weights, symmetric_tt=self.symmetric_tt,
+                                            probcut=self.probcut)
+            else:
+                self.ai_engine = chessAI(self.board_size, player_color_for_engine, self.time_limit or 5,
+                                         weights=self.weights, symmetric_tt=self.symmetric_tt, probcut=self.probcut)
         else:
-            if hasattr(self.ai_engine, 'color'):
-                self.ai_engine.color = player_color_for_engine
+            # 转置表中的估值以局面行棋方为视角，换边后仍可继续使用
+            self.ai_engine.color = player_color_for_engine
+        
+        # 开始新一步的搜索，转置表保留之前各步的结果
+        self.ai_engine.new_search()
         
         # 清空候选列表
         if hasattr(self.ai_engine, 'candidate_list'):
@@ -127,7 +203,10 @@ class ChessAIPlayer(): # Traditional Algorithm AI
         alpha, beta = -float('inf'), float('inf')
         
         # 执行搜索
-        action = self.ai_engine.search(player_color_for_engine, chess_board_representation, 1, alpha, beta, self.search_depth)
+        if self.time_limit:
+            action = self.ai_engine.go(chess_board_representation)
+        else:
+            action = self.ai_engine.search(player_color_for_engine, chess_board_representation, 1, alpha, beta, self.search_depth)
         
         # 检查返回的动作是否有效
         if action is None or not isinstance(action, tuple) or len(action) != 2:
@@ -142,8 +221,15 @@ class AIPlayer():
     '''
     纯MCTS AI玩家（用于训练评估）
     '''
-    def __init__(self, mcts_n=100):
+    def __init__(self, mcts_n=100, endgame_empties=12, book=None, rollouts_per_leaf=1, workers=1, reuse_tree=True):
         self.mcts_n = mcts_n
+        self.rollouts_per_leaf = rollouts_per_leaf # 每个叶节点同时随机模拟的局数
+        self.workers = workers # 根并行的进程数，大于1时每个进程各搜索mcts_n次后合并根节点统计
+        self.parallel = None
+        self.reuse_tree = reuse_tree # 单进程搜索时是否在各步之间保留搜索树
+        self.search = None # 上一步的Mcts搜索器
+        self.endgame = EndgameSolver(endgame_empties) # 剩余空格不超过endgame_empties时精确求解
+        self.book = OpeningBook(book) if book else None # 开局库文件路径，None时不使用开局库
         
     def move(self, board):
         '''
@@ -152,8 +238,27 @@ class AIPlayer():
         if hasattr(board, 'pieces_index') and callable(getattr(board, 'pieces_index')):
             board.pieces_index()
         
+        # 开局库命中时直接走库内走法
+        if self.book is not None:
+            action = self.book.lookup(board)
+            if action is not None:
+                return action
+        
+        # 残局直接求解
+        action = self.endgame.board_move(board)
+        if action is not None:
+            return action
+        
         # 使用纯MCTS获取行动
-        action = Mcts(board, self.mcts_n).mcts_run()
+        if self.workers > 1:
+            if self.parallel is None:
+                self.parallel = RootParallelMcts(self.workers, rollouts_per_leaf=self.rollouts_per_leaf)
+            action = self.parallel.mcts_run(board, self.mcts_n)[0]
+        else:
+            # 上一步的树中找到当前局面时在其子树上继续搜索
+            if not (self.reuse_tree and self.search is not None and self.search.advance(board)):
+                self.search = Mcts(board, self.mcts_n, rollouts_per_leaf=self.rollouts_per_leaf)
+            action = self.search.mcts_run()
         
         valid_locations = board.locations()
         if not valid_locations:
@@ -165,4 +270,11 @@ class AIPlayer():
             action = random.choice(valid_locations)
             
         return action
-    
+
+    def close(self):
+        '''
+        关闭根并行的进程池
+        '''
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
@@ -70,6 +70,12 @@ class PolicyValueNet():
         if model_file:
             net_params = torch.load(model_file)
             self.policy_value_net.load_state_dict(net_params)
+        
+        # 单个局面推理时复用的输入缓冲区
+        self.state_buffer = np.zeros((1, 2, 8, 8), dtype=np.float32)
+        
+        # 权重版本，每次train_step后加1，EvalCache据此判断缓存是否失效
+        self.version = 0
             
     def policy_value(self, state_batch):
         '''
@@ -92,8 +98,8 @@ class PolicyValueNet():
         output:需要值
         实战用
         '''
-        current_state = np.expand_dims(board.current_state(), axis=0)
-        current_state = np.ascontiguousarray(current_state)
+        board.current_state(out=self.state_buffer[0])
+        current_state = self.state_buffer
         if self.use_gpu:
             log_act_probs, value = self.policy_value_net(torch.from_numpy(current_state).cuda().float())
             act_probs = np.exp(log_act_probs.detach().cpu().numpy())
@@ -134,6 +140,7 @@ class PolicyValueNet():
         # 反向传播并优化
         loss.backward()
         self.optimizer.step()
+        self.version += 1
         # 通过落子熵观察情况
         entropy = -torch.mean(torch.sum(torch.exp(log_act_probs) * log_act_probs,1))
        
@@ -0,0 +1,183 @@
+import json
+import random
+import time
+import numpy as np
+import bitboard
+
+'''
+Multi-ProbCut的参数与离线工具
+深度d的搜索值v_d与同一局面浅层d'的搜索值近似满足线性关系 v_d ≈ a * v_d' + b，残差标准差为sigma
+搜索到剩余深度d的节点时先做浅层搜索，若据此预测深层值以足够大的概率超出(alpha, beta)，就直接截断
+每个深度可以有多组浅层深度（由浅到深依次尝试），即Multi-ProbCut
+
+参数格式：{d: [(d', a, b, sigma), ...]}
+运行本文件：
+    python probcut.py calibrate --out probcut.json   用成对的浅层/深层搜索拟合参数
+    python probcut.py benchmark                      等时比较普通搜索与ProbCut搜索的深度和胜率
+'''
+
+DEFAULT_THRESHOLD = 1.5   # 截断阈值：预测值超出窗口threshold个sigma时截断
+MIN_DEPTH = 3             # 剩余深度不小于此值的节点才尝试截断
+
+# 用calibrate()在300个随机局面上拟合（最大深度7）得到的默认参数
+DEFAULT_PARAMS = {
+    3: [(1, 1.1056, -187.96, 903.81)],
+    4: [(1, 1.1406, -1087.64, 1310.34), (2, 1.0981, 9.86, 1026.31)],
+    5: [(1, 1.1926, -404.79, 1535.05), (2, 1.1479, 742.83, 1279.13)],
+    6: [(1, 1.2367, -1136.06, 1742.51), (3, 1.1519, -967.87, 1077.02)],
+    7: [(1, 1.2409, -280.56, 2114.96), (3, 1.1645, -122.64, 1535.74)],
+}
+
+
+def shallow_depths(d):
+    '''
+    深度d的节点所用的浅层搜索深度，由浅到深
+    '''
+    return sorted({max(1, d // 4), d // 2})
+
+
+def load_params(path):
+    '''
+    读取JSON格式的参数文件
+    '''
+    with open(path) as f:
+        data = json.load(f)
+    return {int(d): [tuple(check) for check in checks] for d, checks in data.items()}
+
+
+def save_params(params, path):
+    '''
+    把参数保存为JSON文件
+    '''
+    with open(path, 'w') as f:
+        json.dump({str(d): [list(check) for check in checks] for d, checks in params.items()}, f, indent=2)
+
+
+def random_positions(n, seed=0, min_plies=8, max_plies=50):
+    '''
+    随机对局中截取的局面，返回[((黑棋掩码, 白棋掩码), 行棋方), ...]，行棋方黑棋为-1，白棋为1
+    '''
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n:
+        black, white = 0x0000000810000000, 0x0000001008000000
+        color = -1
+        for _ in range(rng.randint(min_plies, max_plies)):
+            own, opp = (black, white) if color == -1 else (white, black)
+            moves = list(bitboard.squares(bitboard.legal_moves(own, opp)))
+            if not moves:
+                own, opp = opp, own
+                color = -color
+                moves = list(bitboard.squares(bitboard.legal_moves(own, opp)))
+                if not moves:
+                    break
+            sq = rng.choice(moves)
+            flipped = bitboard.flips(own, opp, sq)
+            own, opp = own | flipped | (1 << sq), opp ^ flipped
+            black, white = (own, opp) if color == -1 else (opp, own)
+            color = -color
+        else:
+            own, opp = (black, white) if color == -1 else (white, black)
+            if bitboard.legal_moves(own, opp):
+                positions.append(((black, white), color))
+    return positions
+
+
+def calibrate(positions, max_depth=6, verbose=True):
+    '''
+    对每个局面做1..max_depth层的完整窗口搜索，对每对(d', d)做线性回归
+    返回参数表{d: [(d', a, b, sigma), ...]}
+    '''
+    from chess import AI, INFINITY
+    ai = AI(8, -1, 0)
+    values = {d: [] for d in range(1, max_depth + 1)}
+    start = time.time()
+    for k, (board, color) in enumerate(positions):
+        ai.color = color
+        ai.new_search()
+        ai.transposition_table.clear()
+        for d in range(1, max_depth + 1):
+            values[d].append(ai._pvs(color, board, 1, -INFINITY, INFINITY, d + 1))
+        if verbose and (k + 1) % 20 == 0:
+            print(f"已搜索 {k + 1}/{len(positions)} 个局面，用时 {time.time() - start:.1f}秒")
+
+    params = {}
+    for d in range(MIN_DEPTH, max_depth + 1):
+        checks = []
+        for shallow in shallow_depths(d):
+            x = np.array(values[shallow], dtype=np.float64)
+            y = np.array(values[d], dtype=np.float64)
+            a, b = np.polyfit(x, y, 1)
+            sigma = float(np.std(y - (a * x + b)))
+            checks.append((shallow, round(float(a), 4), round(float(b), 2), round(sigma, 2)))
+        params[d] = checks
+    return params
+
+
+def _play(black_ai, white_ai, board):
+    '''
+    两个AI从给定局面开始限时对局，返回黑棋减白棋的棋子数
+    '''
+    black, white = board
+    color = -1
+    passes = 0
+    ais = {-1: black_ai, 1: white_ai}
+    while passes < 2:
+        ai = ais[color]
+        ai.color = color
+        move = ai.go((black, white))
+        if move is None:
+            passes += 1
+        else:
+            passes = 0
+            black, white = ai.find_change((black, white), color, move)
+        color = -color
+    return bitboard.popcount(black) - bitboard.popcount(white)
+
+
+def benchmark(time_limit=0.5, positions=20, games=10, params_path=None):
+    '''
+    等时比较：在相同的每步限时下统计普通搜索与ProbCut搜索平均完成的深度，
+    并从随机开局出发交换先后手对局，统计ProbCut一方的胜率
+    '''
+    from chess import AI
+    plain = AI(8, -1, time_limit)
+    mpc = AI(8, -1, time_limit, probcut=True, probcut_params=params_path)
+
+    depths = {'plain': [], 'probcut': []}
+    for board, color in random_positions(positions, seed=1):
+        for name, ai in (('plain', plain), ('probcut', mpc)):
+            ai.color = color
+            ai.go(board)
+            depths[name].append(ai.completed_depth)
+    print(f"每步限时 {time_limit}秒，平均完成深度：普通搜索 {np.mean(depths['plain']):.2f}，"
+          f"ProbCut {np.mean(depths['probcut']):.2f}")
+
+    score = 0.0
+    for k, (board, _) in enumerate(random_positions(games, seed=2, min_plies=4, max_plies=4)):
+        for black_ai, white_ai, sign in ((mpc, plain, 1), (plain, mpc, -1)):
+            diff = _play(black_ai, white_ai, board) * sign
+            score += 1.0 if diff > 0 else 0.5 if diff == 0 else 0.0
+        print(f"第{k + 1}组对局后 ProbCut 得分率: {score / (2 * (k + 1)) * 100:.1f}%")
+    return depths, score / (2 * games)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Multi-ProbCut参数拟合与测试')
+    parser.add_argument('command', choices=['calibrate', 'benchmark'])
+    parser.add_argument('--positions', type=int, default=300, help='拟合使用的局面数')
+    parser.add_argument('--depth', type=int, default=6, help='拟合的最大深度')
+    parser.add_argument('--out', default='probcut.json', help='参数输出文件')
+    parser.add_argument('--params', default=None, help='benchmark使用的参数文件，默认使用内置参数')
+    parser.add_argument('--time', type=float, default=0.5, help='benchmark的每步限时（秒）')
+    parser.add_argument('--games', type=int, default=10, help='benchmark的开局数（每个开局交换先后手各下一局）')
+    args = parser.parse_args()
+
+    if args.command == 'calibrate':
+        result = calibrate(random_positions(args.positions), args.depth)
+        save_params(result, args.out)
+        for d, checks in result.items():
+            print(d, checks)
+    else:
+        benchmark(args.time, games=args.games, params_path=args.params)
@@ -0,0 +1,134 @@
+import numpy as np
+import zobrist
+
+'''
+棋盘的8种对称变换（旋转与镜像，与TrainPipeline.get_equi_data中rot90/fliplr生成的变换群相同）
+变换编号s的三位分别表示：第2位先沿主对角线转置，第0位左右镜像，第1位上下翻转
+'''
+
+SYMMETRIES = range(8)
+
+
+def mirror(x):
+    """左右镜像位棋盘（每行内部的位顺序反转）"""
+    x = ((x >> 1) & 0x5555555555555555) | ((x & 0x5555555555555555) << 1)
+    x = ((x >> 2) & 0x3333333333333333) | ((x & 0x3333333333333333) << 2)
+    return ((x >> 4) & 0x0F0F0F0F0F0F0F0F) | ((x & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def flip_vertical(x):
+    """上下翻转位棋盘（行的顺序反转）"""
+    return int.from_bytes(x.to_bytes(8, 'little'), 'big')
+
+
+def transpose(x):
+    """沿主对角线转置位棋盘：(i, j) -> (j, i)"""
+    t = 0x0F0F0F0F00000000 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (x ^ (x << 7))
+    return x ^ t ^ (t >> 7)
+
+
+def transform(x, s):
+    '''
+    对位棋盘施加第s种对称变换
+    '''
+    if s & 4:
+        x = transpose(x)
+    if s & 1:
+        x = mirror(x)
+    if s & 2:
+        x = flip_vertical(x)
+    return x
+
+
+def _square_maps():
+    forward = []
+    inverse = []
+    for s in SYMMETRIES:
+        f = [0] * 64
+        inv = [0] * 64
+        for sq in range(64):
+            i, j = divmod(sq, 8)
+            if s & 4:
+                i, j = j, i
+            if s & 1:
+                j = 7 - j
+            if s & 2:
+                i = 7 - i
+            f[sq] = i * 8 + j
+            inv[i * 8 + j] = sq
+        forward.append(f)
+        inverse.append(inv)
+    return forward, inverse
+
+
+# SQUARE_MAP[s][sq]: 格子sq经第s种变换后的位置；INVERSE_MAP[s]为其逆映射
+SQUARE_MAP, INVERSE_MAP = _square_maps()
+
+
+def canonical(p, o):
+    '''
+    求局面(p, o)在8种对称变换下的最小代表
+    返回(p', o', s)，(p', o')为按(p, o)字典序最小的变换结果，s为所用的变换
+    '''
+    variants = []
+    pt, ot = transpose(p), transpose(o)
+    for s, (x, y) in ((0, (p, o)), (4, (pt, ot))):
+        xm, ym = mirror(x), mirror(y)
+        variants.append((x, y, s))
+        variants.append((xm, ym, s | 1))
+        variants.append((flip_vertical(x), flip_vertical(y), s | 2))
+        variants.append((flip_vertical(xm), flip_vertical(ym), s | 3))
+    return min(variants)
+
+
+def canonical_hash(black, white, color):
+    '''
+    局面（含行棋方）规范代表的Zobrist键值
+    返回(key, s)：对称的局面得到相同的key，s把原局面变换到规范代表
+    '''
+    b, w, s = canonical(black, white)
+    return zobrist.hash_position(b, w, color), s
+
+
+def to_canonical_square(sq, s):
+    '''
+    原局面中的格子编号映射到规范代表中的编号
+    '''
+    return SQUARE_MAP[s][sq]
+
+
+def from_canonical_square(sq, s):
+    '''
+    规范代表中的格子编号（如其中记录的最佳走法）映射回原局面
+    '''
+    return INVERSE_MAP[s][sq]
+
+
+def transform_planes(planes, s):
+    '''
+    对(..., 8, 8)数组的最后两维施加第s种对称变换，如Board.current_state()的输入平面
+    '''
+    if s & 4:
+        planes = np.swapaxes(planes, -1, -2)
+    if s & 1:
+        planes = planes[..., ::-1]
+    if s & 2:
+        planes = planes[..., ::-1, :]
+    return planes
+
+
+def inverse_planes(planes, s):
+    '''
+    transform_planes的逆变换，如把规范代表上得到的落子概率映射回原局面
+    '''
+    if s & 2:
+        planes = planes[..., ::-1, :]
+    if s & 1:
+        planes = planes[..., ::-1]
+    if s & 4:
+        planes = np.swapaxes(planes, -1, -2)
+    return planes
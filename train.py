@@ -5,6 +5,7 @@ import torch
 from game import Game
 from player import AIPlayerplus, AIPlayer
 from policy_value_net import PolicyValueNet  # Pytorch
+from eval_cache import EvalCache  # 网络评估缓存
 
 class TrainPipeline():
     def __init__(self, init_model=None):
@@ -25,6 +26,7 @@ class TrainPipeline():
         self.kl_targ = 0.01
         self.best_win_ratio = 0.0
         self.AIPlayerplus_num = 1000      # mcts升级版玩家搜索次数
+        self.mcts_batch_size = 8          # 自我对弈时每批送入网络评估的叶节点数
         self.AIPlayer_num = 100      # 纯mcts玩家搜索次数
         if init_model:
             # 从初始策略价值网络开始学习
@@ -34,6 +36,8 @@ class TrainPipeline():
             self.policy_value_net = PolicyValueNet(use_gpu=(self.device.type == "cuda"))
             
         self.AIPlayerplus = AIPlayerplus(self.policy_value_net)
+        # 自我对弈与评估共用的网络评估缓存，对称局面共用条目，网络更新后自动清空
+        self.eval_cache = EvalCache(self.policy_value_net, capacity=200000, symmetric=True)
 
     def get_equi_data(self, play_data):
         '''
@@ -57,8 +61,10 @@ class TrainPipeline():
         收集自我对抗数据
         '''
         for i in range(n_games):
-            game = Game(AIPlayerplus(self.policy_value_net.policy_value_fn,self.AIPlayerplus_num), 
-                        AIPlayerplus(self.policy_value_net.policy_value_fn,self.AIPlayerplus_num))
+            game = Game(AIPlayerplus(self.eval_cache.policy_value_fn,self.AIPlayerplus_num,
+                                     batch_size=self.mcts_batch_size, policy_value_batch=self.eval_cache.policy_value), 
+                        AIPlayerplus(self.eval_cache.policy_value_fn,self.AIPlayerplus_num,
+                                     batch_size=self.mcts_batch_size, policy_value_batch=self.eval_cache.policy_value))
             game.selfplay_run_plus()
             play_data = game.playdata
             self.episode_len = len(play_data)
@@ -111,7 +117,7 @@ class TrainPipeline():
         '''
         win_cnt = defaultdict(int)
         for i in range(n_games):
-            game = Game(AIPlayerplus(self.policy_value_net.policy_value_fn), AIPlayer(self.AIPlayer_num))
+            game = Game(AIPlayerplus(self.eval_cache.policy_value_fn), AIPlayer(self.AIPlayer_num))
             game.selfplay_run()
             winner = game.board.win()
             win_cnt[winner] += 1
@@ -129,8 +135,8 @@ class TrainPipeline():
             for i in range(self.game_batch_num):
                 print(f"开始收集第 {i+1}/{self.game_batch_num} 批自我对弈数据...")
                 self.collect_selfplay_data(self.play_batch_size)
-                print("batch i:{}, episode_len:{}".format(
-                        i+1, self.episode_len))
+                print("batch i:{}, episode_len:{}, cache_hit_rate:{:.3f}".format(
+                        i+1, self.episode_len, self.eval_cache.hit_rate))
                 print("开始更新策略网络...")
                 loss, entropy = self.policy_update()
                 # 检查当前模型表现并保存参数
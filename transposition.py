@@ -0,0 +1,76 @@
+import numpy as np
+
+'''
+定长置换表（Transposition Table）
+以局面的Zobrist键值为索引，所有字段存放在预分配的NumPy数组中，大小固定
+每个索引对应两个槽：深度优先槽（保留搜索更深的结果）与总是替换槽（保存最新结果）
+'''
+
+EMPTY = 0
+EXACT = 1    # 精确值
+LOWER = 2    # 下界：真实值 >= value（发生了beta剪枝）
+UPPER = 3    # 上界：真实值 <= value（没有走法超过alpha）
+
+
+class TranspositionTable(object):
+    '''
+    定长、数组存储的置换表
+    '''
+    def __init__(self, size_log2=16):
+        '''
+        参数:
+            size_log2: 索引位数，共 2 * 2**size_log2 个槽
+        '''
+        n = 1 << size_log2
+        self.mask = n - 1
+        self.checks = np.zeros(2 * n, dtype=np.uint32)   # 键值高32位，用于校验
+        self.depths = np.zeros(2 * n, dtype=np.int8)     # 剩余搜索深度
+        self.values = np.zeros(2 * n, dtype=np.int32)    # 搜索值
+        self.flags = np.zeros(2 * n, dtype=np.uint8)     # EMPTY/EXACT/LOWER/UPPER
+        self.moves = np.full(2 * n, -1, dtype=np.int8)   # 最佳走法的格子编号，-1为无
+        self.ages = np.zeros(2 * n, dtype=np.uint8)      # 写入时的搜索代数
+        self.generation = 0
+
+    def new_search(self):
+        '''
+        开始新一轮搜索（每步棋调用一次），旧一轮的条目在深度优先槽中可被替换
+        '''
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        '''
+        清空置换表
+        '''
+        self.flags[:] = EMPTY
+        self.moves[:] = -1
+
+    def probe(self, key):
+        '''
+        查询局面，命中时返回(depth, value, flag, move)，否则返回None
+        '''
+        i = (key & self.mask) << 1
+        check = key >> 32
+        for slot in (i, i + 1):
+            if self.flags[slot] != EMPTY and self.checks[slot] == check:
+                return (int(self.depths[slot]), int(self.values[slot]),
+                        int(self.flags[slot]), int(self.moves[slot]))
+        return None
+
+    def store(self, key, depth, value, flag, move=-1):
+        '''
+        写入局面的搜索结果
+        同一局面、不浅于已有结果、或已有结果来自旧一轮搜索时写入深度优先槽，否则写入总是替换槽
+        '''
+        i = (key & self.mask) << 1
+        check = key >> 32
+        if (self.flags[i] == EMPTY or self.checks[i] == check
+                or depth >= self.depths[i] or self.ages[i] != self.generation):
+            slot = i
+        else:
+            slot = i + 1
+        self.checks[slot] = check
+        self.depths[slot] = depth
+        self.values[slot] = value
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.ages[slot] = self.generation
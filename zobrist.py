@@ -0,0 +1,54 @@
+import random
+import bitboard
+
+'''
+Zobrist哈希：为每个局面提供64位的位置标识
+随机数使用固定种子生成，保证不同进程、不同次运行得到相同的键值
+'''
+
+_rng = random.Random(0x5EED0DE110)
+
+BLACK = [_rng.getrandbits(64) for _ in range(64)]   # 黑棋占据各格子的随机数
+WHITE = [_rng.getrandbits(64) for _ in range(64)]   # 白棋占据各格子的随机数
+FLIP = [b ^ w for b, w in zip(BLACK, WHITE)]        # 格子上棋子变色时异或的值
+SIDE = _rng.getrandbits(64)                         # 轮到白棋行棋时异或的值
+
+
+def _byte_table(keys):
+    """BYTES[k][v]: 第k个字节（第k行）取值为v时，其中各格子随机数的异或"""
+    table = []
+    for k in range(8):
+        row = []
+        for v in range(256):
+            h = 0
+            for bit in range(8):
+                if (v >> bit) & 1:
+                    h ^= keys[k * 8 + bit]
+            row.append(h)
+        table.append(row)
+    return table
+
+
+BLACK_BYTES = _byte_table(BLACK)
+WHITE_BYTES = _byte_table(WHITE)
+
+
+def flip_hash(flipped):
+    '''
+    一组棋子变色对键值的改变量
+    '''
+    h = 0
+    for sq in bitboard.squares(flipped):
+        h ^= FLIP[sq]
+    return h
+
+
+def hash_position(black, white, color):
+    '''
+    从头计算局面的Zobrist键值，color为行棋方'X'或'O'
+    按行查表，每方8次查表
+    '''
+    h = SIDE if color == 'O' else 0
+    for k in range(8):
+        h ^= BLACK_BYTES[k][(black >> (k * 8)) & 0xFF] ^ WHITE_BYTES[k][(white >> (k * 8)) & 0xFF]
+    return h